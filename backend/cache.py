@@ -0,0 +1,104 @@
+import logging
+import os
+from typing import Awaitable, Callable, Optional
+
+import redis
+import redis.asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_CLIENT_OPTIONS = {"socket_timeout": 0.5, "socket_connect_timeout": 0.5}
+
+# Caching is optional: without REDIS_URL every read goes straight to the database.
+# Async handlers use the asyncio client; sync code paths (cart checkout, AI tools)
+# use the blocking one.
+redis_client: Optional[redis.asyncio.Redis] = (
+    redis.asyncio.Redis.from_url(REDIS_URL, **_CLIENT_OPTIONS) if REDIS_URL else None
+)
+sync_redis_client: Optional[redis.Redis] = (
+    redis.Redis.from_url(REDIS_URL, **_CLIENT_OPTIONS) if REDIS_URL else None
+)
+
+
+async def cache_get_or_set(
+    key: str,
+    ttl: int,
+    loader: Callable[[], Awaitable[bytes]]
+) -> bytes:
+    """
+    Read-through cache: return the cached payload or load and store it
+
+    Args:
+        key: Cache key
+        ttl: Time to live in seconds
+        loader: Produces the payload on a cache miss
+
+    Returns:
+        Cached or freshly loaded payload
+
+    Redis errors are logged and treated as a cache miss.
+    """
+    if redis_client is None:
+        return await loader()
+
+    try:
+        cached = await redis_client.get(key)
+        if cached is not None:
+            return cached
+    except redis.RedisError as e:
+        logger.warning("Cache read failed for %s: %s", key, e)
+        return await loader()
+
+    payload = await loader()
+
+    try:
+        await redis_client.setex(key, ttl, payload)
+    except redis.RedisError as e:
+        logger.warning("Cache write failed for %s: %s", key, e)
+
+    return payload
+
+
+async def cache_invalidate(*patterns: str) -> None:
+    """
+    Delete cached entries matching glob-style patterns
+
+    Args:
+        *patterns: Key patterns, e.g. "tx:user:42:*"
+
+    Keys are found with SCAN so Redis is never blocked by KEYS.
+    """
+    if redis_client is None:
+        return
+
+    try:
+        for pattern in patterns:
+            keys = [key async for key in redis_client.scan_iter(match=pattern, count=500)]
+            if keys:
+                await redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", patterns, e)
+
+
+def cache_invalidate_sync(*patterns: str) -> None:
+    """
+    Blocking variant of cache_invalidate for synchronous code paths
+
+    Args:
+        *patterns: Key patterns, e.g. "tx:user:42:*"
+    """
+    if sync_redis_client is None:
+        return
+
+    try:
+        for pattern in patterns:
+            keys = list(sync_redis_client.scan_iter(match=pattern, count=500))
+            if keys:
+                sync_redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", patterns, e)
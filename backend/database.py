@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import os
 from dotenv import load_dotenv
 
@@ -8,10 +11,64 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Connection pool per engine and per worker process; size it so that
+# workers * 2 engines * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays under max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+# Fail fast with an error instead of queueing requests for 30s when the pool is exhausted
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "5"))
+# Behind PgBouncer the bouncer owns the pool; the app opens a connection per checkout
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "").lower() in ("1", "true", "yes")
+# Server-side limits (ms) so a hung query or an abandoned transaction can't hold
+# a pool slot and its row locks forever; 0 disables a limit
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "5000"))
+DB_IDLE_IN_TRANSACTION_TIMEOUT = int(os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT", "10000"))
+
+if DB_PGBOUNCER:
+    _pool_options = {"poolclass": NullPool}
+else:
+    _pool_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True
+    }
+
+# Larger compiled-statement cache for the per-filter-shape lambda statements
+engine = create_engine(
+    DATABASE_URL,
+    query_cache_size=1200,
+    **_pool_options
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine on the same database for handlers that run on the event loop
+async_engine = create_async_engine(
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    query_cache_size=1200,
+    **_pool_options
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False)
+
+
+def set_session_timeouts(dbapi_connection, connection_record):
+    # Once per new connection rather than per checkout, so requests pay no extra round trip
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET statement_timeout = {DB_STATEMENT_TIMEOUT}")
+    cursor.execute(f"SET idle_in_transaction_session_timeout = {DB_IDLE_IN_TRANSACTION_TIMEOUT}")
+    cursor.close()
+    dbapi_connection.commit()
+
+
+# Under PgBouncer transaction pooling session settings would leak to other
+# clients; set the timeouts on the PgBouncer/database side instead
+if not DB_PGBOUNCER:
+    event.listen(engine, "connect", set_session_timeouts)
+    event.listen(async_engine.sync_engine, "connect", set_session_timeouts)
+
 Base = declarative_base()
 
 def get_db():
@@ -20,3 +77,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRouter
+from sqlalchemy import inspect, text
 
 from database import Base, engine
 from faceid.router import router as faceid_router
@@ -48,6 +49,46 @@ app.include_router(rag_live_query_router, tags=["RAG Live Query"])
 app.include_router(predict_router, prefix="/api")
 app.include_router(rag_transaction_router)
 
+SCHEMA_LOCK_KEY = 7210431
+
+
+def add_product_purchase_count(conn):
+    # products.purchase_count was added after the table shipped; create_all
+    # won't add it, so add it here and count the existing purchases once
+    columns = {column["name"] for column in inspect(conn).get_columns("products")}
+    if "purchase_count" in columns:
+        return
+    
+    conn.execute(text(
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS purchase_count INTEGER NOT NULL DEFAULT 0"
+    ))
+    conn.execute(text("""
+        UPDATE products SET purchase_count = purchases.total
+        FROM (
+            SELECT product_id, count(*) AS total
+            FROM transactions
+            WHERE transaction_type = 'purchase'
+              AND product_id IS NOT NULL
+              AND deleted_at IS NULL
+            GROUP BY product_id
+        ) AS purchases
+        WHERE products.id = purchases.product_id
+    """))
+
+
 @app.on_event("startup")
 def startup_event():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # Workers start together; serialize table creation so their DDL doesn't race
+    with engine.begin() as conn:
+        # Waiting on the lock and building indexes on full tables can outlast
+        # the per-connection statement_timeout
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        Base.metadata.create_all(bind=conn)
+        add_product_purchase_count(conn)
+        # create_all skips existing tables, so add indexes declared on them later
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+    # Build the OpenAPI schema once per worker; FastAPI caches it on the app
+    app.openapi()
\ No newline at end of file
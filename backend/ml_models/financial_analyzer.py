@@ -19,6 +19,9 @@ from models.user import User
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per round trip when streaming a user's transaction history
+STREAM_BATCH_SIZE = 500
+
 
 class FinancialAnalyzer:
     """Analyzes user financial data and generates insights."""
@@ -121,30 +124,39 @@ class FinancialAnalyzer:
         """Analyze transaction patterns."""
         start_date = datetime.now() - timedelta(days=months_back * 30)
         
-        transactions = self.db.query(Transaction).filter(
+        # Stream the rows in batches instead of loading the whole period at once
+        transactions = self.db.query(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.transaction_type,
+            Transaction.description,
+            Transaction.created_at
+        ).filter(
             and_(
                 Transaction.user_id == self.user_id,
                 Transaction.created_at >= start_date,
                 Transaction.deleted_at.is_(None)
             )
-        ).order_by(desc(Transaction.created_at)).all()
+        ).order_by(desc(Transaction.created_at)).yield_per(STREAM_BATCH_SIZE)
         
         # Categorize transactions
         by_type = {}
-        total_count = len(transactions)
+        total_count = 0
         recent_transactions = []
         
-        for txn in transactions[:20]:  # Last 20 transactions
-            recent_transactions.append({
-                "id": txn.id,
-                "amount": float(txn.amount),
-                "currency": txn.currency,
-                "type": txn.transaction_type,
-                "description": txn.description,
-                "date": txn.created_at.isoformat()
-            })
-        
         for txn in transactions:
+            total_count += 1
+            if len(recent_transactions) < 20:  # Last 20 transactions
+                recent_transactions.append({
+                    "id": txn.id,
+                    "amount": float(txn.amount),
+                    "currency": txn.currency,
+                    "type": txn.transaction_type,
+                    "description": txn.description,
+                    "date": txn.created_at.isoformat()
+                })
+            
             txn_type = txn.transaction_type
             if txn_type not in by_type:
                 by_type[txn_type] = {
@@ -168,14 +180,18 @@ class FinancialAnalyzer:
         start_date = datetime.now() - timedelta(days=months_back * 30)
         spending_types = ['purchase', 'withdrawal', 'transfer']
         
-        transactions = self.db.query(Transaction).filter(
+        transactions = self.db.query(
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.created_at
+        ).filter(
             and_(
                 Transaction.user_id == self.user_id,
                 Transaction.transaction_type.in_(spending_types),
                 Transaction.created_at >= start_date,
                 Transaction.deleted_at.is_(None)
             )
-        ).all()
+        ).yield_per(STREAM_BATCH_SIZE)
         
         total_spending = 0.0
         by_category: Dict[str, float] = {}
@@ -221,19 +237,24 @@ class FinancialAnalyzer:
         start_date = datetime.now() - timedelta(days=months_back * 30)
         income_types = ['deposit']
         
-        transactions = self.db.query(Transaction).filter(
+        transactions = self.db.query(
+            Transaction.amount,
+            Transaction.created_at
+        ).filter(
             and_(
                 Transaction.user_id == self.user_id,
                 Transaction.transaction_type.in_(income_types),
                 Transaction.created_at >= start_date,
                 Transaction.deleted_at.is_(None)
             )
-        ).all()
+        ).yield_per(STREAM_BATCH_SIZE)
         
         total_income = 0.0
+        income_count = 0
         monthly_income: Dict[str, float] = {}
         
         for txn in transactions:
+            income_count += 1
             amount = float(txn.amount)
             total_income += amount
             
@@ -246,7 +267,7 @@ class FinancialAnalyzer:
             "total_income": total_income,
             "average_monthly_income": avg_monthly_income,
             "monthly_breakdown": monthly_income,
-            "income_transactions_count": len(transactions)
+            "income_transactions_count": income_count
         }
     
     def _get_financial_goals_analysis(self) -> Dict[str, Any]:
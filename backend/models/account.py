@@ -1,5 +1,4 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, func
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -13,8 +12,8 @@ class Account(Base):
     currency = Column(String(3), default='USD')  # 'USD', 'EUR', 'KZT'
     status = Column(String, default='active')  # 'active', 'blocked', 'closed'
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     deleted_at = Column(DateTime, nullable=True)
     
     # Relationships
@@ -1,5 +1,4 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, String
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, String, Index, text, func
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -13,10 +12,19 @@ class Cart(Base):
     quantity = Column(Integer, default=1)
     status = Column(String, default="active")  # 'active', 'purchased', 'removed'
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     deleted_at = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        # Active cart lookups by product (product stats, delete checks)
+        Index(
+            'carts_product_active',
+            product_id,
+            postgresql_where=text("status = 'active' AND deleted_at IS NULL")
+        ),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="carts")
     product = relationship("Product", back_populates="carts")
@@ -1,5 +1,4 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Numeric, Index, text, func
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -13,11 +12,32 @@ class Product(Base):
     currency = Column(String(3), default='USD')  # 'USD', 'EUR', 'KZT'
     category = Column(String, nullable=True)  # 'banking', 'insurance', 'investment'
     is_active = Column(String, default='active')  # 'active', 'inactive'
+    purchase_count = Column(Integer, nullable=False, default=0, server_default='0')  # Non-deleted purchase transactions
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     deleted_at = Column(DateTime, nullable=True)
     
+    # Partial indexes matching the listing filters (active, non-deleted, newest first)
+    __table_args__ = (
+        Index(
+            'products_active_created',
+            created_at.desc(),
+            postgresql_where=text("deleted_at IS NULL AND is_active = 'active'")
+        ),
+        Index(
+            'products_cat_active_created',
+            category,
+            created_at.desc(),
+            postgresql_where=text("deleted_at IS NULL AND is_active = 'active'")
+        ),
+        Index(
+            'products_purchase_count',
+            purchase_count.desc(),
+            postgresql_where=text("deleted_at IS NULL AND is_active = 'active'")
+        ),
+    )
+    
     # Relationships
     transactions = relationship("Transaction", back_populates="product")
     carts = relationship("Cart", back_populates="product")
\ No newline at end of file
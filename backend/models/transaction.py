@@ -1,5 +1,4 @@
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Index, text, func
 from database import Base
 from sqlalchemy.orm import relationship
 
@@ -22,10 +21,43 @@ class Transaction(Base):
     # Для покупок
     product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
     
-    created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False)
     deleted_at = Column(DateTime, nullable=True)
     
+    __table_args__ = (
+        # Product purchase statistics
+        Index(
+            'transactions_product_purchase',
+            product_id,
+            postgresql_where=text("transaction_type = 'purchase' AND deleted_at IS NULL")
+        ),
+        # Keyset-paginated history, newest first, for both sides of a transfer
+        Index('transactions_user_created', user_id, created_at.desc(), id.desc()),
+        Index(
+            'transactions_to_user_created',
+            to_user_id, created_at.desc(), id.desc(),
+            postgresql_where=text("to_user_id IS NOT NULL")
+        ),
+        # Per-currency statistics over live transactions, sent and received
+        Index(
+            'transactions_user_stats',
+            user_id, currency, created_at,
+            postgresql_where=text("deleted_at IS NULL")
+        ),
+        Index(
+            'transactions_to_user_stats',
+            to_user_id, currency, created_at,
+            postgresql_where=text("transaction_type = 'transfer' AND deleted_at IS NULL")
+        ),
+        Index('transactions_account_created', account_id, created_at.desc(), id.desc()),
+        Index(
+            'transactions_to_account_created',
+            to_account_id, created_at.desc(), id.desc(),
+            postgresql_where=text("to_account_id IS NOT NULL")
+        ),
+    )
+    
     # Relationships
     user = relationship("User", foreign_keys=[user_id], back_populates="transactions")
     account = relationship("Account", foreign_keys=[account_id], back_populates="transactions")
@@ -16,6 +16,7 @@ from langchain_core.tools import tool
 from typing import Dict, Any
 from services.cart import service as cart_service
 from services.cart.schemas import CartItemCreate, CheckoutRequest
+from services.transaction.service import invalidate_transaction_cache
 
 
 # Global context for user_id and db session
@@ -274,13 +275,14 @@ def checkout_cart(account_id: int) -> str:
         checkout_request = CheckoutRequest(account_id=account_id)
         
         # Process checkout
-        checkout_response = cart_service.checkout_cart(user_id, checkout_request, db)
+        checkout_response = cart_service.checkout(user_id, checkout_request, db)
+        invalidate_transaction_cache(user_id)
         
         # Format success response
         response = "✅ Purchase Complete!\n\n"
-        response += f"📦 Items Purchased: {len(checkout_response.purchased_items)}\n"
+        response += f"📦 Items Purchased: {checkout_response.items_purchased}\n"
         
-        for item in checkout_response.purchased_items:
+        for item in cart_summary.items:
             response += f"   • Product #{item.product_id} (x{item.quantity})\n"
         
         response += f"\n💰 Total Charged: {checkout_response.total_amount} {checkout_response.currency}\n"
@@ -289,11 +291,7 @@ def checkout_cart(account_id: int) -> str:
         # Get updated balance
         updated_account = account_service.get_account(account_id, db)
         response += f"📊 New Balance: {updated_account.balance} {updated_account.currency}\n\n"
-        
-        if checkout_response.failed_items:
-            response += f"⚠️ Note: {len(checkout_response.failed_items)} item(s) could not be purchased"
-        else:
-            response += "Thank you for your purchase! 🎉"
+        response += "Thank you for your purchase! 🎉"
         
         return response
         
@@ -82,7 +82,7 @@ def search_products(
         )
         
         # Search products
-        products = product_service.search_products(db, filters, skip=0, limit=limit)
+        products = product_service.search_products(db, filters, limit=limit)
         
         if not products:
             search_desc = []
@@ -241,7 +241,7 @@ def get_products_by_category(category: str, limit: int = 10) -> str:
         limit = min(limit, 20)
         
         # Get products by category
-        products = product_service.get_products_by_category(category_lower, db, skip=0, limit=limit)
+        products = product_service.get_products_by_category(category_lower, db, limit=limit)
         
         if not products:
             return f"No active products found in the {category} category."
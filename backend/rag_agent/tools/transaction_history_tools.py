@@ -80,7 +80,7 @@ def get_my_transactions(limit: int = 10, transaction_type: Optional[str] = None)
         
         # Get transactions
         transactions = transaction_service.get_user_transactions(
-            user_id, db, filters, include_deleted=False, skip=0, limit=limit
+            user_id, db, filters, include_deleted=False, limit=limit
         )
         
         if not transactions:
@@ -174,24 +174,24 @@ def get_transaction_stats(currency: str = "USD", days: int = 30) -> str:
         response += f"Total Transactions: {stats.total_transactions}\n\n"
         
         response += f"💵 Deposits:\n"
-        response += f"   Count: {stats.total_deposits_count}\n"
-        response += f"   Amount: {stats.total_deposits_amount} {currency}\n\n"
+        response += f"   Count: {stats.deposits_count}\n"
+        response += f"   Amount: {stats.total_deposits} {currency}\n\n"
         
         response += f"💸 Withdrawals:\n"
-        response += f"   Count: {stats.total_withdrawals_count}\n"
-        response += f"   Amount: {stats.total_withdrawals_amount} {currency}\n\n"
+        response += f"   Count: {stats.withdrawals_count}\n"
+        response += f"   Amount: {stats.total_withdrawals} {currency}\n\n"
         
         response += f"↔️ Transfers:\n"
-        response += f"   Sent: {stats.total_transfers_sent_count} ({stats.total_transfers_sent_amount} {currency})\n"
-        response += f"   Received: {stats.total_transfers_received_count} ({stats.total_transfers_received_amount} {currency})\n\n"
+        response += f"   Sent: {stats.transfers_sent_count} ({stats.total_transfers_sent} {currency})\n"
+        response += f"   Received: {stats.transfers_received_count} ({stats.total_transfers_received} {currency})\n\n"
         
         response += f"🛒 Purchases:\n"
-        response += f"   Count: {stats.total_purchases_count}\n"
-        response += f"   Amount: {stats.total_purchases_amount} {currency}\n\n"
+        response += f"   Count: {stats.purchases_count}\n"
+        response += f"   Amount: {stats.total_purchases} {currency}\n\n"
         
         # Calculate net change
-        net_in = float(stats.total_deposits_amount) + float(stats.total_transfers_received_amount)
-        net_out = float(stats.total_withdrawals_amount) + float(stats.total_transfers_sent_amount) + float(stats.total_purchases_amount)
+        net_in = float(stats.total_deposits) + float(stats.total_transfers_received)
+        net_out = float(stats.total_withdrawals) + float(stats.total_transfers_sent) + float(stats.total_purchases)
         net_change = net_in - net_out
         
         response += f"📈 Net Balance Change: {net_change:+.2f} {currency}\n"
@@ -243,7 +243,7 @@ def get_account_transactions(account_id: int, limit: int = 10) -> str:
         
         # Get account transactions
         transactions = transaction_service.get_account_transactions(
-            account_id, user_id, db, include_deleted=False, skip=0, limit=limit
+            account_id, user_id, db, include_deleted=False, limit=limit
         )
         
         if not transactions:
@@ -24,7 +24,8 @@ from services.transaction.service import (
     create_deposit,
     create_withdrawal,
     create_transfer,
-    create_purchase
+    create_purchase,
+    invalidate_transaction_cache
 )
 from services.transaction.schemas import (
     TransactionDeposit,
@@ -105,6 +106,7 @@ def deposit_money(
         
         # Execute deposit
         result = create_deposit(deposit_data, user_id, db)
+        invalidate_transaction_cache(result.user_id, result.to_user_id)
         
         return f"""✅ Deposit successful!
 Transaction ID: {result.id}
@@ -165,6 +167,7 @@ def withdraw_money(
         
         # Execute withdrawal
         result = create_withdrawal(withdrawal_data, user_id, db)
+        invalidate_transaction_cache(result.user_id, result.to_user_id)
         
         return f"""✅ Withdrawal successful!
 Transaction ID: {result.id}
@@ -233,6 +236,7 @@ def transfer_money(
         
         # Execute transfer
         result = create_transfer(transfer_data, user_id, db)
+        invalidate_transaction_cache(result.user_id, result.to_user_id)
         
         return f"""✅ Transfer successful!
 Transaction ID: {result.id}
@@ -296,6 +300,7 @@ def purchase_product(
         
         # Execute purchase
         result = create_purchase(purchase_data, user_id, db)
+        invalidate_transaction_cache(result.user_id, result.to_user_id)
         
         return f"""✅ Purchase successful!
 Transaction ID: {result.id}
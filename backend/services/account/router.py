@@ -6,9 +6,10 @@ from services.account.schemas import (
     AccountCreate,
     AccountUpdate,
     AccountRead,
-    AccountBalanceUpdate
+    AccountBalanceUpdate,
+    AccountPage
 )
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
@@ -58,10 +59,10 @@ def get_user_accounts(
     return service.get_user_accounts(user_id, db, include_deleted)
 
 
-@router.get("/", response_model=List[AccountRead])
+@router.get("/", response_model=AccountPage)
 def get_all_accounts(
     include_deleted: bool = Query(False, description="Include deleted accounts"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor_id: Optional[int] = Query(None, gt=0, description="ID of the last account on the previous page"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     db: Session = Depends(get_db)
 ):
@@ -70,10 +71,10 @@ def get_all_accounts(
     
     **Query parameters:**
     - include_deleted: Whether to include soft-deleted accounts (default: False)
-    - skip: Number of records to skip for pagination (default: 0)
+    - cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum number of records to return (default: 100, max: 1000)
     """
-    return service.get_all_accounts(db, include_deleted, skip, limit)
+    return service.get_all_accounts(db, include_deleted, cursor_id, limit)
 
 
 @router.put("/{account_id}", response_model=AccountRead)
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 
 
@@ -65,6 +65,8 @@ class AccountUpdate(BaseModel):
 
 class AccountRead(BaseModel):
     """Schema for reading account data"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: int
     account_type: str
@@ -75,8 +77,11 @@ class AccountRead(BaseModel):
     updated_at: datetime
     deleted_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+
+class AccountPage(BaseModel):
+    """Schema for a page of accounts"""
+    items: List[AccountRead]
+    next_cursor: Optional[int] = Field(None, description="ID of the last account on this page")
 
 
 class AccountBalanceUpdate(BaseModel):
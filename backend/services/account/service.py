@@ -1,14 +1,17 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import func, insert
 from models.account import Account
 from models.user import User
-from services.account.schemas import AccountRead, AccountCreate, AccountUpdate, AccountBalanceUpdate
+from services.account.schemas import AccountRead, AccountCreate, AccountUpdate, AccountBalanceUpdate, AccountPage
 from typing import List, Optional
-from datetime import datetime
 from decimal import Decimal
 
 
+# Writes read the new row back with RETURNING instead of a refresh SELECT
+_ACCOUNT_READ_COLUMNS = tuple(getattr(Account, name) for name in AccountRead.model_fields)
+
+
 def get_account_by_id(account_id: int, db: Session, include_deleted: bool = False) -> Account:
     """
     Get account by ID with optional deleted filter
@@ -62,7 +65,7 @@ def verify_user_exists(user_id: int, db: Session) -> User:
 
 def create_account(
     account_data: AccountCreate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Create a new account for a user
@@ -81,24 +84,23 @@ def create_account(
     verify_user_exists(account_data.user_id, db)
     
     # Create new account
-    new_account = Account(
-        user_id=account_data.user_id,
-        account_type=account_data.account_type,
-        balance=account_data.balance or Decimal('0.00'),
-        currency=account_data.currency,
-        status='active'
-    )
-    
-    db.add(new_account)
+    new_account = db.execute(
+        insert(Account).values(
+            user_id=account_data.user_id,
+            account_type=account_data.account_type,
+            balance=account_data.balance or Decimal('0.00'),
+            currency=account_data.currency,
+            status='active'
+        ).returning(*_ACCOUNT_READ_COLUMNS)
+    ).one()
     db.commit()
-    db.refresh(new_account)
     
-    return AccountRead.from_orm(new_account)
+    return AccountRead.model_validate(new_account._asdict())
 
 
 def get_account(
     account_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Get account by ID
@@ -114,12 +116,12 @@ def get_account(
         HTTPException: If account not found
     """
     account = get_account_by_id(account_id, db)
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
 
 def get_user_accounts(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     include_deleted: bool = False
 ) -> List[AccountRead]:
     """
@@ -147,41 +149,48 @@ def get_user_accounts(
     
     accounts = query.all()
     
-    return [AccountRead.from_orm(account) for account in accounts]
+    return [AccountRead.model_validate(account) for account in accounts]
 
 
 def get_all_accounts(
-    db: Session = Depends(get_db),
+    db: Session,
     include_deleted: bool = False,
-    skip: int = 0,
+    cursor_id: Optional[int] = None,
     limit: int = 100
-) -> List[AccountRead]:
+) -> AccountPage:
     """
-    Get all accounts with pagination
+    Get all accounts with keyset pagination by ID
     
     Args:
         db: Database session
         include_deleted: Whether to include deleted accounts
-        skip: Number of records to skip
+        cursor_id: ID of the last account on the previous page
         limit: Maximum number of records to return
         
     Returns:
-        List of accounts
+        Page of accounts; next_cursor is None on the last page
     """
     query = db.query(Account)
     
     if not include_deleted:
         query = query.filter(Account.deleted_at.is_(None))
     
-    accounts = query.offset(skip).limit(limit).all()
+    # Seek past the cursor on the primary key instead of OFFSET
+    if cursor_id is not None:
+        query = query.filter(Account.id > cursor_id)
     
-    return [AccountRead.from_orm(account) for account in accounts]
+    accounts = query.order_by(Account.id).limit(limit).all()
+    
+    return AccountPage(
+        items=[AccountRead.model_validate(account) for account in accounts],
+        next_cursor=accounts[-1].id if len(accounts) == limit else None
+    )
 
 
 def update_account(
     account_id: int,
     account_data: AccountUpdate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Update account information
@@ -205,18 +214,16 @@ def update_account(
     for field, value in update_data.items():
         setattr(account, field, value)
     
-    account.updated_at = datetime.now()
-    
     db.commit()
     db.refresh(account)
     
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
 
 def update_account_balance(
     account_id: int,
     balance_data: AccountBalanceUpdate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Update account balance (deposit or withdraw)
@@ -252,17 +259,15 @@ def update_account_balance(
             )
         account.balance -= balance_data.amount
     
-    account.updated_at = datetime.now()
-    
     db.commit()
     db.refresh(account)
     
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
 
 def delete_account(
     account_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     soft_delete: bool = True
 ) -> dict:
     """
@@ -290,7 +295,7 @@ def delete_account(
     
     if soft_delete:
         # Soft delete: mark as deleted
-        account.deleted_at = datetime.now()
+        account.deleted_at = func.now()
         account.status = 'closed'
         db.commit()
         return {"message": "Account soft deleted successfully"}
@@ -303,7 +308,7 @@ def delete_account(
 
 def restore_account(
     account_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Restore a soft-deleted account
@@ -326,17 +331,16 @@ def restore_account(
     # Restore account
     account.deleted_at = None
     account.status = 'active'
-    account.updated_at = datetime.now()
     
     db.commit()
     db.refresh(account)
     
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
 
 def block_account(
     account_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Block an account
@@ -357,17 +361,16 @@ def block_account(
         raise HTTPException(status_code=400, detail="Account is already blocked")
     
     account.status = 'blocked'
-    account.updated_at = datetime.now()
     
     db.commit()
     db.refresh(account)
     
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
 
 def unblock_account(
     account_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> AccountRead:
     """
     Unblock an account
@@ -388,10 +391,9 @@ def unblock_account(
         raise HTTPException(status_code=400, detail="Account is not blocked")
     
     account.status = 'active'
-    account.updated_at = datetime.now()
     
     db.commit()
     db.refresh(account)
     
-    return AccountRead.from_orm(account)
+    return AccountRead.model_validate(account)
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 from typing import Optional
 
@@ -20,6 +20,8 @@ class UserLogin(BaseModel):
 
 class UserRead(BaseModel):
     """Schema for reading user data"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     name: str
     surname: str
@@ -29,6 +31,3 @@ class UserRead(BaseModel):
     created_at: datetime
     updated_at: datetime
     deleted_at: Optional[datetime] = None
-
-    class Config:
-        from_attributes = True
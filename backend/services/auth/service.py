@@ -1,7 +1,6 @@
-from fastapi import HTTPException, Depends, UploadFile
+from fastapi import HTTPException, UploadFile
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
-from database import get_db
 from models.user import User
 from models.account import Account
 from services.auth.schemas import UserRead
@@ -47,8 +46,8 @@ async def create_user(
     email: str,
     phone: str,
     password: str,
-    avatar_file: Optional[UploadFile] = None,
-    db: Session = Depends(get_db)
+    db: Session,
+    avatar_file: Optional[UploadFile] = None
 ) -> UserRead:
     """
     Create a new user with optional avatar
@@ -59,8 +58,8 @@ async def create_user(
         email: User's email
         phone: User's phone number
         password: User's password
-        avatar_file: Optional avatar image file
         db: Database session
+        avatar_file: Optional avatar image file
         
     Returns:
         Created user data
@@ -121,10 +120,10 @@ async def create_user(
             # If avatar save fails, still return user but log error
             print(f"Error saving avatar for user {new_user.id}: {str(e)}")
 
-    return UserRead.from_orm(new_user)
+    return UserRead.model_validate(new_user)
 
 
-def login_user(email: str, password: str, db: Session = Depends(get_db)) -> UserRead:
+def login_user(email: str, password: str, db: Session) -> UserRead:
     """
     Login user with email and password
     
@@ -144,10 +143,10 @@ def login_user(email: str, password: str, db: Session = Depends(get_db)) -> User
     if user.deleted_at:
         raise HTTPException(status_code=401, detail="User is deleted")
     
-    return UserRead.from_orm(user)
+    return UserRead.model_validate(user)
 
 
-def get_user(user_id: int, db: Session = Depends(get_db)) -> UserRead:
+def get_user(user_id: int, db: Session) -> UserRead:
     """
     Get user by ID
     
@@ -166,13 +165,13 @@ def get_user(user_id: int, db: Session = Depends(get_db)) -> UserRead:
     if user.deleted_at:
         raise HTTPException(status_code=404, detail="User is deleted")
 
-    return UserRead.from_orm(user)
+    return UserRead.model_validate(user)
 
 
 async def update_user_avatar(
     user_id: int,
     avatar_file: UploadFile,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> UserRead:
     """
     Update user's avatar
@@ -211,6 +210,6 @@ async def update_user_avatar(
         db.commit()
         db.refresh(user)
         
-        return UserRead.from_orm(user)
+        return UserRead.model_validate(user)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating avatar: {str(e)}")
@@ -1,16 +1,21 @@
 from fastapi import APIRouter, Depends, Query, Path
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
+from cache import cache_invalidate
 from services.cart import service
+from services.transaction.service import transaction_cache_patterns
 from services.cart.schemas import (
     CartItemCreate,
     CartItemUpdate,
     CartItemRead,
     CartSummary,
     CheckoutRequest,
-    CheckoutResponse
+    CheckoutResponse,
+    CartHistoryPage
 )
-from typing import List
+from typing import Annotated, List, Optional
+from datetime import datetime
 
 router = APIRouter(prefix="/cart", tags=["cart"])
 
@@ -59,10 +64,11 @@ def get_user_cart(
     return service.get_user_cart(user_id, db, include_removed)
 
 
-@router.get("/history", response_model=List[CartItemRead])
+@router.get("/history", response_model=CartHistoryPage)
 def get_cart_history(
     user_id: int = Query(..., gt=0, description="User ID"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor_updated_at: Optional[datetime] = Query(None, description="updated_at of the last item on the previous page"),
+    cursor_id: Optional[int] = Query(None, gt=0, description="ID of the last item on the previous page"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     db: Session = Depends(get_db)
 ):
@@ -71,10 +77,10 @@ def get_cart_history(
     
     **Query parameters:**
     - user_id: User ID (required)
-    - skip: Pagination offset
+    - cursor_updated_at, cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum results to return
     """
-    return service.get_cart_history(user_id, db, skip, limit)
+    return service.get_cart_history(user_id, db, cursor_updated_at, cursor_id, limit)
 
 
 @router.get("/{cart_item_id}", response_model=CartItemRead)
@@ -158,10 +164,10 @@ def clear_cart(
 
 
 @router.post("/checkout", response_model=CheckoutResponse)
-def checkout(
-    user_id: int = Query(..., gt=0, description="User ID"),
-    checkout_data: CheckoutRequest = ...,
-    db: Session = Depends(get_db)
+async def checkout(
+    checkout_data: CheckoutRequest,
+    user_id: Annotated[int, Query(gt=0, description="User ID")],
+    db: Annotated[AsyncSession, Depends(get_async_db)]
 ):
     """
     Checkout and purchase all items in cart.
@@ -186,7 +192,11 @@ def checkout(
     
     **Note:** All items must use the same currency as the payment account.
     """
-    return service.checkout(user_id, checkout_data, db)
+    result = await db.run_sync(
+        lambda session: service.checkout(user_id, checkout_data, session)
+    )
+    await cache_invalidate(*transaction_cache_patterns(user_id))
+    return result
 
 
 @router.post("/payment-account")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
 from decimal import Decimal
@@ -43,6 +43,8 @@ class CartItemUpdate(BaseModel):
 
 class CartItemRead(BaseModel):
     """Schema for reading cart item data"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: int
     product_id: int
@@ -53,8 +55,17 @@ class CartItemRead(BaseModel):
     updated_at: datetime
     deleted_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+
+class CartHistoryCursor(BaseModel):
+    """Keyset pagination cursor: the last cart item of a history page"""
+    updated_at: datetime
+    id: int
+
+
+class CartHistoryPage(BaseModel):
+    """Schema for a page of cart history"""
+    items: List[CartItemRead]
+    next_cursor: Optional[CartHistoryCursor] = None
 
 
 class CartItemWithProduct(BaseModel):
@@ -1,6 +1,6 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import func, insert, tuple_, update
 from models.cart import Cart
 from models.product import Product
 from models.account import Account
@@ -13,13 +13,19 @@ from services.cart.schemas import (
     CartItemWithProduct,
     CartSummary,
     CheckoutRequest,
-    CheckoutResponse
+    CheckoutResponse,
+    CartHistoryCursor,
+    CartHistoryPage
 )
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
 
+# Writes read the row back with RETURNING instead of a refresh SELECT
+_CART_ITEM_READ_COLUMNS = tuple(getattr(Cart, name) for name in CartItemRead.model_fields)
+
+
 def get_cart_item_by_id(
     cart_item_id: int,
     db: Session,
@@ -50,13 +56,19 @@ def get_cart_item_by_id(
     return cart_item
 
 
-def verify_product_available(product_id: int, db: Session) -> Product:
+def verify_product_available(
+    product_id: int,
+    db: Session,
+    for_share: bool = False
+) -> Product:
     """
     Verify that product exists and is available for purchase
     
     Args:
         product_id: Product ID
         db: Database session
+        for_share: Share-lock the product row until the transaction ends, so
+            it can't be deleted meanwhile
         
     Returns:
         Product object
@@ -64,7 +76,10 @@ def verify_product_available(product_id: int, db: Session) -> Product:
     Raises:
         HTTPException: If product not found or not available
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
+    query = db.query(Product).filter(Product.id == product_id)
+    if for_share:
+        query = query.with_for_update(read=True)
+    product = query.first()
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -78,7 +93,12 @@ def verify_product_available(product_id: int, db: Session) -> Product:
     return product
 
 
-def verify_user_owns_account(user_id: int, account_id: int, db: Session) -> Account:
+def verify_user_owns_account(
+    user_id: int,
+    account_id: int,
+    db: Session,
+    for_update: bool = False
+) -> Account:
     """
     Verify that user owns the specified account
     
@@ -86,6 +106,7 @@ def verify_user_owns_account(user_id: int, account_id: int, db: Session) -> Acco
         user_id: User ID
         account_id: Account ID
         db: Database session
+        for_update: Lock the account row until the transaction ends
         
     Returns:
         Account object
@@ -93,7 +114,10 @@ def verify_user_owns_account(user_id: int, account_id: int, db: Session) -> Acco
     Raises:
         HTTPException: If account not found or user doesn't own it
     """
-    account = db.query(Account).filter(Account.id == account_id).first()
+    query = db.query(Account).filter(Account.id == account_id)
+    if for_update:
+        query = query.with_for_update()
+    account = query.first()
     
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
@@ -110,7 +134,7 @@ def verify_user_owns_account(user_id: int, account_id: int, db: Session) -> Acco
 def add_to_cart(
     user_id: int,
     cart_data: CartItemCreate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> CartItemRead:
     """
     Add item to cart or update quantity if already exists
@@ -126,52 +150,48 @@ def add_to_cart(
     Raises:
         HTTPException: If validation fails
     """
-    # Verify product is available
-    product = verify_product_available(cart_data.product_id, db)
+    # Verify product is available; the share lock makes a concurrent
+    # delete_product wait until this item is committed and counted
+    product = verify_product_available(cart_data.product_id, db, for_share=True)
     
     # Verify account ownership if provided
     if cart_data.account_id:
         verify_user_owns_account(user_id, cart_data.account_id, db)
     
-    # Check if item already in cart
-    existing_item = db.query(Cart).filter(
-        Cart.user_id == user_id,
-        Cart.product_id == cart_data.product_id,
-        Cart.status == 'active',
-        Cart.deleted_at.is_(None)
+    # Add to the quantity of the item if it is already in the cart
+    values = {"quantity": Cart.quantity + cart_data.quantity}
+    if cart_data.account_id:
+        values["account_id"] = cart_data.account_id
+    
+    cart_item = db.execute(
+        update(Cart).where(
+            Cart.user_id == user_id,
+            Cart.product_id == cart_data.product_id,
+            Cart.status == 'active',
+            Cart.deleted_at.is_(None)
+        ).values(**values).returning(*_CART_ITEM_READ_COLUMNS)
     ).first()
     
-    if existing_item:
-        # Update quantity
-        existing_item.quantity += cart_data.quantity
-        if cart_data.account_id:
-            existing_item.account_id = cart_data.account_id
-        existing_item.updated_at = datetime.now()
-        
-        db.commit()
-        db.refresh(existing_item)
-        
-        return CartItemRead.from_orm(existing_item)
-    else:
+    if cart_item is None:
         # Create new cart item
-        new_cart_item = Cart(
-            user_id=user_id,
-            product_id=cart_data.product_id,
-            account_id=cart_data.account_id,
-            quantity=cart_data.quantity,
-            status='active'
-        )
-        
-        db.add(new_cart_item)
-        db.commit()
-        db.refresh(new_cart_item)
-        
-        return CartItemRead.from_orm(new_cart_item)
+        cart_item = db.execute(
+            insert(Cart).values(
+                user_id=user_id,
+                product_id=cart_data.product_id,
+                account_id=cart_data.account_id,
+                quantity=cart_data.quantity,
+                status='active'
+            ).returning(*_CART_ITEM_READ_COLUMNS)
+        ).one()
+    
+    db.commit()
+    
+    return CartItemRead.model_validate(cart_item._asdict())
 
 
 def get_user_cart(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     include_removed: bool = False
 ) -> CartSummary:
     """
@@ -243,7 +263,7 @@ def get_user_cart(
 def get_cart_item(
     cart_item_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> CartItemRead:
     """
     Get specific cart item
@@ -265,14 +285,14 @@ def get_cart_item(
     if cart_item.user_id != user_id:
         raise HTTPException(status_code=403, detail="You don't own this cart item")
     
-    return CartItemRead.from_orm(cart_item)
+    return CartItemRead.model_validate(cart_item)
 
 
 def update_cart_item(
     cart_item_id: int,
     user_id: int,
     cart_data: CartItemUpdate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> CartItemRead:
     """
     Update cart item
@@ -305,18 +325,16 @@ def update_cart_item(
     for field, value in update_data.items():
         setattr(cart_item, field, value)
     
-    cart_item.updated_at = datetime.now()
-    
     db.commit()
     db.refresh(cart_item)
     
-    return CartItemRead.from_orm(cart_item)
+    return CartItemRead.model_validate(cart_item)
 
 
 def remove_from_cart(
     cart_item_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     soft_delete: bool = True
 ) -> dict:
     """
@@ -343,7 +361,7 @@ def remove_from_cart(
     if soft_delete:
         # Soft delete: mark as removed
         cart_item.status = 'removed'
-        cart_item.deleted_at = datetime.now()
+        cart_item.deleted_at = func.now()
         db.commit()
         return {"message": "Item removed from cart"}
     else:
@@ -355,7 +373,7 @@ def remove_from_cart(
 
 def clear_cart(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> dict:
     """
     Clear all items from user's cart
@@ -379,7 +397,7 @@ def clear_cart(
     # Mark all as removed
     for item in cart_items:
         item.status = 'removed'
-        item.deleted_at = datetime.now()
+        item.deleted_at = func.now()
     
     db.commit()
     
@@ -389,7 +407,7 @@ def clear_cart(
 def checkout(
     user_id: int,
     checkout_data: CheckoutRequest,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> CheckoutResponse:
     """
     Checkout and purchase all items in cart
@@ -405,8 +423,10 @@ def checkout(
     Raises:
         HTTPException: If validation fails or insufficient funds
     """
-    # Verify account ownership and status
-    account = verify_user_owns_account(user_id, checkout_data.account_id, db)
+    # Verify account ownership and status. The account and cart rows stay locked
+    # until commit, so concurrent checkouts can't both spend the same balance
+    # or buy the same cart items
+    account = verify_user_owns_account(user_id, checkout_data.account_id, db, for_update=True)
     
     if account.status != 'active':
         raise HTTPException(
@@ -419,7 +439,7 @@ def checkout(
         Cart.user_id == user_id,
         Cart.status == 'active',
         Cart.deleted_at.is_(None)
-    ).all()
+    ).with_for_update().all()
     
     if not cart_items:
         raise HTTPException(status_code=400, detail="Cart is empty")
@@ -427,7 +447,7 @@ def checkout(
     # Calculate total and verify products
     total_amount = Decimal('0.00')
     currency = account.currency
-    transaction_ids = []
+    purchases = []
     
     for item in cart_items:
         product = verify_product_available(item.product_id, db)
@@ -441,6 +461,16 @@ def checkout(
         
         item_total = product.price * item.quantity
         total_amount += item_total
+        
+        purchases.append({
+            "user_id": user_id,
+            "account_id": checkout_data.account_id,
+            "amount": item_total,
+            "currency": currency,
+            "transaction_type": 'purchase',
+            "description": f"Purchase of {product.title} (x{item.quantity})",
+            "product_id": item.product_id
+        })
     
     # Check sufficient funds
     if account.balance < total_amount:
@@ -449,35 +479,34 @@ def checkout(
             detail=f"Insufficient funds. Required: {total_amount} {currency}, Available: {account.balance} {currency}"
         )
     
-    # Process purchases
-    for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        item_total = product.price * item.quantity
-        
-        # Create transaction
-        transaction = Transaction(
-            user_id=user_id,
-            account_id=checkout_data.account_id,
-            amount=item_total,
-            currency=currency,
-            transaction_type='purchase',
-            description=f"Purchase of {product.title} (x{item.quantity})",
-            product_id=item.product_id
-        )
-        
-        db.add(transaction)
-        db.flush()  # Get transaction ID
-        
-        transaction_ids.append(transaction.id)
-        
-        # Update cart item status
-        item.status = 'purchased'
-        item.account_id = checkout_data.account_id
-        item.updated_at = datetime.now()
+    # Process purchases: one INSERT for all transactions, IDs in cart order
+    transaction_ids = db.execute(
+        insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+        purchases
+    ).scalars().all()
+    
+    product_ids = [item.product_id for item in cart_items]
+    cart_item_ids = [item.id for item in cart_items]
+    
+    # Count the purchases on the products (featured products ranking); a product
+    # appears in the cart at most once
+    db.execute(
+        update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(purchase_count=Product.purchase_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    
+    # Update cart item status
+    db.execute(
+        update(Cart)
+        .where(Cart.id.in_(cart_item_ids))
+        .values(status='purchased', account_id=checkout_data.account_id)
+        .execution_options(synchronize_session=False)
+    )
     
     # Update account balance
     account.balance -= total_amount
-    account.updated_at = datetime.now()
     
     db.commit()
     
@@ -494,7 +523,7 @@ def checkout(
 def set_payment_account(
     user_id: int,
     account_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> dict:
     """
     Set payment account for all items in cart
@@ -526,7 +555,6 @@ def set_payment_account(
     count = 0
     for item in cart_items:
         item.account_id = account_id
-        item.updated_at = datetime.now()
         count += 1
     
     db.commit()
@@ -536,26 +564,53 @@ def set_payment_account(
 
 def get_cart_history(
     user_id: int,
-    db: Session = Depends(get_db),
-    skip: int = 0,
+    db: Session,
+    cursor_updated_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
     limit: int = 100
-) -> List[CartItemRead]:
+) -> CartHistoryPage:
     """
     Get user's cart history (purchased and removed items)
     
     Args:
         user_id: User ID
         db: Database session
-        skip: Number of records to skip
+        cursor_updated_at: updated_at of the last item on the previous page
+        cursor_id: ID of the last item on the previous page
         limit: Maximum number of records to return
         
     Returns:
-        List of historical cart items
+        Page of historical cart items; next_cursor is None on the last page
+        
+    Raises:
+        HTTPException: If only one part of the cursor is given
     """
-    cart_items = db.query(Cart).filter(
+    query = db.query(Cart).filter(
         Cart.user_id == user_id,
         Cart.status.in_(['purchased', 'removed'])
-    ).order_by(Cart.updated_at.desc()).offset(skip).limit(limit).all()
+    )
     
-    return [CartItemRead.from_orm(item) for item in cart_items]
-
+    # Keyset pagination on (updated_at, id), newest first; updated_at alone
+    # would skip items sharing the boundary timestamp
+    if (cursor_updated_at is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=422,
+            detail="cursor_updated_at and cursor_id must be given together"
+        )
+    
+    if cursor_id is not None:
+        query = query.filter(
+            tuple_(Cart.updated_at, Cart.id) < tuple_(cursor_updated_at, cursor_id)
+        )
+    
+    cart_items = query.order_by(Cart.updated_at.desc(), Cart.id.desc()).limit(limit).all()
+    
+    next_cursor = None
+    if len(cart_items) == limit:
+        last = cart_items[-1]
+        next_cursor = CartHistoryCursor(updated_at=last.updated_at, id=last.id)
+    
+    return CartHistoryPage(
+        items=[CartItemRead.model_validate(item) for item in cart_items],
+        next_cursor=next_cursor
+    )
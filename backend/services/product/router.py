@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, Path
+from fastapi import APIRouter, Depends, Query, Path, Request, Response
 from sqlalchemy.orm import Session
 from database import get_db
 from services.product import service
@@ -8,13 +8,49 @@ from services.product.schemas import (
     ProductRead,
     ProductSearch,
     ProductStats,
-    CategoryStats
+    CategoryStats,
+    ProductPage
 )
 from typing import List, Optional
+from datetime import datetime
 from decimal import Decimal
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Catalog reads are safe for browsers and CDNs to reuse for a short while
+CACHE_CONTROL = "public, max-age=60"
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set caching headers and return a 304 if the client already has this version
+    
+    Args:
+        request: Incoming request (checked for If-None-Match)
+        response: Response the headers are added to
+        etag: Current ETag of the resource
+        
+    Returns:
+        Empty 304 response, or None if the full body must be sent
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return None
+    
+    # Weak comparison: W/"x" and "x" match each other
+    current = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == current:
+            return Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+            )
+    return None
+
 
 @router.post("/", response_model=ProductRead, status_code=201)
 def create_product(
@@ -38,22 +74,28 @@ def create_product(
 
 @router.get("/{product_id}", response_model=ProductRead)
 def get_product(
+    request: Request,
+    response: Response,
     product_id: int = Path(..., gt=0, description="Product ID"),
     db: Session = Depends(get_db)
 ):
     """
     Get product details by ID.
     
-    Returns only active, non-deleted products.
+    Returns only active, non-deleted products. Supports ETag / If-None-Match.
     """
+    cached = not_modified(request, response, service.get_products_etag(db, product_id=product_id))
+    if cached:
+        return cached
     return service.get_product(product_id, db)
 
 
-@router.get("/", response_model=List[ProductRead])
+@router.get("/", response_model=ProductPage)
 def get_all_products(
     include_deleted: bool = Query(False, description="Include deleted products"),
     include_inactive: bool = Query(False, description="Include inactive products"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor_created_at: Optional[datetime] = Query(None, description="created_at of the last product on the previous page"),
+    cursor_id: Optional[int] = Query(None, gt=0, description="ID of the last product on the previous page"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     db: Session = Depends(get_db)
 ):
@@ -63,23 +105,27 @@ def get_all_products(
     **Query parameters:**
     - include_deleted: Include soft-deleted products
     - include_inactive: Include inactive products
-    - skip: Pagination offset
+    - cursor_created_at, cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum results to return (max: 1000)
     
     By default, returns only active, non-deleted products.
     """
-    return service.get_all_products(db, include_deleted, include_inactive, skip, limit)
+    products = service.get_all_products(
+        db, include_deleted, include_inactive, cursor_created_at, cursor_id, limit
+    )
+    return service.build_product_page(products, limit)
 
 
-@router.post("/search", response_model=List[ProductRead])
+@router.post("/search", response_model=ProductPage)
 def search_products(
     search_query: Optional[str] = Query(None, description="Search in title and description"),
     category: Optional[str] = Query(None, description="Filter by category"),
-    min_price: Optional[float] = Query(None, ge=0, description="Minimum price"),
-    max_price: Optional[float] = Query(None, ge=0, description="Maximum price"),
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Minimum price"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Maximum price"),
     currency: Optional[str] = Query(None, description="Filter by currency"),
     is_active: Optional[str] = Query(None, description="Filter by status"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor_created_at: Optional[datetime] = Query(None, description="created_at of the last product on the previous page"),
+    cursor_id: Optional[int] = Query(None, gt=0, description="ID of the last product on the previous page"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     db: Session = Depends(get_db)
 ):
@@ -93,7 +139,7 @@ def search_products(
     - max_price: Maximum price filter
     - currency: Filter by currency ('USD', 'EUR', 'KZT')
     - is_active: Filter by status ('active', 'inactive')
-    - skip: Pagination offset
+    - cursor_created_at, cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum results to return
     
     All filters are optional. By default returns only active products.
@@ -102,19 +148,23 @@ def search_products(
     filters = ProductSearch(
         search_query=search_query,
         category=category,
-        min_price=Decimal(str(min_price)) if min_price is not None else None,
-        max_price=Decimal(str(max_price)) if max_price is not None else None,
+        min_price=min_price,
+        max_price=max_price,
         currency=currency,
         is_active=is_active
     )
     
-    return service.search_products(db, filters, skip, limit)
+    products = service.search_products(db, filters, cursor_created_at, cursor_id, limit)
+    return service.build_product_page(products, limit)
 
 
-@router.get("/category/{category}", response_model=List[ProductRead])
+@router.get("/category/{category}", response_model=ProductPage)
 def get_products_by_category(
+    request: Request,
+    response: Response,
     category: str = Path(..., description="Product category"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor_created_at: Optional[datetime] = Query(None, description="created_at of the last product on the previous page"),
+    cursor_id: Optional[int] = Query(None, gt=0, description="ID of the last product on the previous page"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
     db: Session = Depends(get_db)
 ):
@@ -125,12 +175,19 @@ def get_products_by_category(
     - category: One of 'banking', 'insurance', 'investment', 'cards'
     
     Returns only active, non-deleted products in the specified category.
+    Supports ETag / If-None-Match.
     """
-    return service.get_products_by_category(category, db, skip, limit)
+    cached = not_modified(request, response, service.get_products_etag(db, category=category))
+    if cached:
+        return cached
+    products = service.get_products_by_category(category, db, cursor_created_at, cursor_id, limit)
+    return service.build_product_page(products, limit)
 
 
 @router.get("/featured/top", response_model=List[ProductRead])
 def get_featured_products(
+    request: Request,
+    response: Response,
     limit: int = Query(10, ge=1, le=50, description="Maximum number of products to return"),
     db: Session = Depends(get_db)
 ):
@@ -141,7 +198,12 @@ def get_featured_products(
     
     **Query parameters:**
     - limit: Maximum number of products to return (default: 10, max: 50)
+    
+    Supports ETag / If-None-Match.
     """
+    cached = not_modified(request, response, service.get_products_etag(db))
+    if cached:
+        return cached
     return service.get_featured_products(db, limit)
 
 
@@ -241,6 +303,8 @@ def get_product_stats(
 
 @router.get("/category/{category}/stats", response_model=CategoryStats)
 def get_category_stats(
+    request: Request,
+    response: Response,
     category: str = Path(..., description="Product category"),
     db: Session = Depends(get_db)
 ):
@@ -255,6 +319,12 @@ def get_category_stats(
     - Active products count
     - Total purchases
     - Total revenue
+    
+    Supports ETag / If-None-Match.
     """
+    # Purchases bump the product's purchase_count, and with it updated_at
+    cached = not_modified(request, response, service.get_products_etag(db, category=category))
+    if cached:
+        return cached
     return service.get_category_stats(category, db)
 
@@ -1,34 +1,32 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Literal, Optional, get_args
 from decimal import Decimal
 
 
+# Literal fields are validated by pydantic-core without entering Python
+Currency = Literal['USD', 'EUR', 'KZT']
+Category = Literal['banking', 'insurance', 'investment', 'cards']
+Status = Literal['active', 'inactive']
+
+ALLOWED_CURRENCIES = frozenset(get_args(Currency))
+ALLOWED_CATEGORIES = frozenset(get_args(Category))
+ALLOWED_STATUSES = frozenset(get_args(Status))
+
+
 class ProductCreate(BaseModel):
     """Schema for creating a new product"""
     title: str = Field(..., min_length=2, max_length=200, description="Product title")
     description: Optional[str] = Field(None, max_length=2000, description="Product description")
     price: Decimal = Field(..., gt=0, description="Product price (must be positive)")
-    currency: str = Field(default='USD', description="Currency code: 'USD', 'EUR', 'KZT'")
-    category: Optional[str] = Field(None, description="Product category: 'banking', 'insurance', 'investment', 'cards'")
-    
-    @field_validator('currency')
-    @classmethod
-    def validate_currency(cls, v: str) -> str:
-        allowed_currencies = ['USD', 'EUR', 'KZT']
-        v = v.upper()
-        if v not in allowed_currencies:
-            raise ValueError(f"Currency must be one of: {', '.join(allowed_currencies)}")
-        return v
+    currency: Currency = Field(default='USD', description="Currency code: 'USD', 'EUR', 'KZT'")
+    category: Optional[Category] = Field(None, description="Product category: 'banking', 'insurance', 'investment', 'cards'")
     
-    @field_validator('category')
+    @field_validator('currency', mode='before')
     @classmethod
-    def validate_category(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_categories = ['banking', 'insurance', 'investment', 'cards']
-            if v not in allowed_categories:
-                raise ValueError(f"Category must be one of: {', '.join(allowed_categories)}")
-        return v
+    def uppercase_currency(cls, v: Any) -> Any:
+        # Accept currency codes case-insensitively ('usd' -> 'USD')
+        return v.upper() if isinstance(v, str) else v
 
 
 class ProductUpdate(BaseModel):
@@ -36,92 +34,60 @@ class ProductUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=2, max_length=200, description="Product title")
     description: Optional[str] = Field(None, max_length=2000, description="Product description")
     price: Optional[Decimal] = Field(None, gt=0, description="Product price (must be positive)")
-    currency: Optional[str] = Field(None, description="Currency code: 'USD', 'EUR', 'KZT'")
-    category: Optional[str] = Field(None, description="Product category")
-    is_active: Optional[str] = Field(None, description="Product status: 'active', 'inactive'")
+    currency: Optional[Currency] = Field(None, description="Currency code: 'USD', 'EUR', 'KZT'")
+    category: Optional[Category] = Field(None, description="Product category")
+    is_active: Optional[Status] = Field(None, description="Product status: 'active', 'inactive'")
     
-    @field_validator('currency')
+    @field_validator('currency', mode='before')
     @classmethod
-    def validate_currency(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_currencies = ['USD', 'EUR', 'KZT']
-            v = v.upper()
-            if v not in allowed_currencies:
-                raise ValueError(f"Currency must be one of: {', '.join(allowed_currencies)}")
-        return v
-    
-    @field_validator('category')
-    @classmethod
-    def validate_category(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_categories = ['banking', 'insurance', 'investment', 'cards']
-            if v not in allowed_categories:
-                raise ValueError(f"Category must be one of: {', '.join(allowed_categories)}")
-        return v
-    
-    @field_validator('is_active')
-    @classmethod
-    def validate_is_active(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_statuses = ['active', 'inactive']
-            if v not in allowed_statuses:
-                raise ValueError(f"Status must be one of: {', '.join(allowed_statuses)}")
-        return v
+    def uppercase_currency(cls, v: Any) -> Any:
+        # Accept currency codes case-insensitively ('usd' -> 'USD')
+        return v.upper() if isinstance(v, str) else v
 
 
 class ProductRead(BaseModel):
     """Schema for reading product data"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     title: str
     description: Optional[str] = None
     price: Decimal
-    currency: str
-    category: Optional[str] = None
-    is_active: str
+    currency: Currency
+    category: Optional[Category] = None
+    is_active: Status
+    purchase_count: int = 0
     created_at: datetime
     updated_at: datetime
     deleted_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+
+class ProductCursor(BaseModel):
+    """Keyset pagination cursor: the last product of a page"""
+    created_at: datetime
+    id: int
+
+
+class ProductPage(BaseModel):
+    """Schema for a page of products"""
+    items: List[ProductRead]
+    next_cursor: Optional[ProductCursor] = None
 
 
 class ProductSearch(BaseModel):
     """Schema for searching products"""
     search_query: Optional[str] = Field(None, description="Search in title and description")
-    category: Optional[str] = Field(None, description="Filter by category")
+    category: Optional[Category] = Field(None, description="Filter by category")
     min_price: Optional[Decimal] = Field(None, ge=0, description="Minimum price")
     max_price: Optional[Decimal] = Field(None, ge=0, description="Maximum price")
-    currency: Optional[str] = Field(None, description="Filter by currency")
-    is_active: Optional[str] = Field(None, description="Filter by status")
-    
-    @field_validator('category')
-    @classmethod
-    def validate_category(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_categories = ['banking', 'insurance', 'investment', 'cards']
-            if v not in allowed_categories:
-                raise ValueError(f"Category must be one of: {', '.join(allowed_categories)}")
-        return v
-    
-    @field_validator('currency')
-    @classmethod
-    def validate_currency(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_currencies = ['USD', 'EUR', 'KZT']
-            v = v.upper()
-            if v not in allowed_currencies:
-                raise ValueError(f"Currency must be one of: {', '.join(allowed_currencies)}")
-        return v
+    currency: Optional[Currency] = Field(None, description="Filter by currency")
+    is_active: Optional[Status] = Field(None, description="Filter by status")
     
-    @field_validator('is_active')
+    @field_validator('currency', mode='before')
     @classmethod
-    def validate_is_active(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_statuses = ['active', 'inactive']
-            if v not in allowed_statuses:
-                raise ValueError(f"Status must be one of: {', '.join(allowed_statuses)}")
-        return v
+    def uppercase_currency(cls, v: Any) -> Any:
+        # Accept currency codes case-insensitively ('usd' -> 'USD')
+        return v.upper() if isinstance(v, str) else v
 
 
 class ProductStats(BaseModel):
@@ -1,7 +1,7 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from database import get_db
+from sqlalchemy import or_, func, true, tuple_, lambda_stmt, select, insert, update, delete
+from pydantic import TypeAdapter
 from models.product import Product
 from models.transaction import Transaction
 from models.cart import Cart
@@ -11,11 +11,19 @@ from services.product.schemas import (
     ProductUpdate,
     ProductSearch,
     ProductStats,
-    CategoryStats
+    CategoryStats,
+    ProductCursor,
+    ProductPage,
+    ALLOWED_CATEGORIES
 )
 from typing import List, Optional
 from datetime import datetime
-from decimal import Decimal
+
+
+_INVALID_CATEGORY_DETAIL = "Invalid category. Must be one of: banking, insurance, investment, cards"
+
+# Validates a whole result set in one pydantic-core call
+_PRODUCT_LIST_ADAPTER = TypeAdapter(List[ProductRead])
 
 
 def get_product_by_id(
@@ -53,9 +61,147 @@ def get_product_by_id(
     return product
 
 
+def check_product_cursor(
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None
+) -> None:
+    """
+    Check that a page cursor is given in full or not at all
+    
+    Args:
+        cursor_created_at: created_at of the last product on the previous page
+        cursor_id: ID of the last product on the previous page
+        
+    Raises:
+        HTTPException: If only one part of the cursor is given (products sharing
+            the boundary timestamp would be skipped)
+    """
+    if (cursor_created_at is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=422,
+            detail="cursor_created_at and cursor_id must be given together"
+        )
+
+
+def apply_product_cursor(
+    query,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None
+):
+    """
+    Apply keyset pagination on (created_at, id), newest first
+    
+    Args:
+        query: Product query to paginate
+        cursor_created_at: created_at of the last product on the previous page
+        cursor_id: ID of the last product on the previous page
+        
+    Returns:
+        Query filtered past the cursor and ordered newest first
+    """
+    check_product_cursor(cursor_created_at, cursor_id)
+    if cursor_id is not None:
+        query = query.filter(
+            tuple_(Product.created_at, Product.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    
+    return query.order_by(Product.created_at.desc(), Product.id.desc())
+
+
+def build_product_page(products: List[ProductRead], limit: int) -> ProductPage:
+    """
+    Wrap a page of products with the cursor for the next page
+    
+    Args:
+        products: Products on the current page
+        limit: Page size that was requested
+        
+    Returns:
+        Page of products; next_cursor is None on the last page
+    """
+    next_cursor = None
+    if len(products) == limit:
+        last = products[-1]
+        next_cursor = ProductCursor(created_at=last.created_at, id=last.id)
+    
+    return ProductPage(items=products, next_cursor=next_cursor)
+
+
+def update_product_row(
+    product_id: int,
+    db: Session,
+    *criteria,
+    **values
+) -> Optional[Product]:
+    """
+    Update a product with UPDATE ... RETURNING, without a prior SELECT
+    
+    Args:
+        product_id: Product ID
+        db: Database session
+        *criteria: Extra WHERE conditions the row must satisfy
+        **values: Column values to set
+        
+    Returns:
+        Updated product, or None if no row matched
+    """
+    return db.execute(
+        update(Product)
+        .where(Product.id == product_id, *criteria)
+        .values(**values)
+        .returning(Product)
+    ).scalar_one_or_none()
+
+
+def check_category(category: str) -> None:
+    """
+    Validate a category path value
+    
+    Args:
+        category: Product category
+        
+    Raises:
+        HTTPException: If the category is not one of the allowed categories
+    """
+    if category not in ALLOWED_CATEGORIES:
+        raise HTTPException(status_code=400, detail=_INVALID_CATEGORY_DETAIL)
+
+
+def get_products_etag(
+    db: Session,
+    product_id: Optional[int] = None,
+    category: Optional[str] = None
+) -> str:
+    """
+    Build a weak ETag for a set of products from max(updated_at) and row count
+    
+    Args:
+        db: Database session
+        product_id: Restrict to a single product
+        category: Restrict to a category
+        
+    Returns:
+        Weak ETag that changes whenever a matching product is written or removed
+        
+    Raises:
+        HTTPException: If the category is invalid (checked before any 304)
+    """
+    query = db.query(func.max(Product.updated_at), func.count(Product.id))
+    
+    if product_id is not None:
+        query = query.filter(Product.id == product_id)
+    if category is not None:
+        check_category(category)
+        query = query.filter(Product.category == category)
+    
+    latest, total = query.one()
+    version = latest.timestamp() if latest else 0
+    return f'W/"{version}-{total}"'
+
+
 def create_product(
     product_data: ProductCreate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Create a new product
@@ -67,26 +213,28 @@ def create_product(
     Returns:
         Created product data
     """
-    # Create new product
-    new_product = Product(
-        title=product_data.title,
-        description=product_data.description,
-        price=product_data.price,
-        currency=product_data.currency,
-        category=product_data.category,
-        is_active='active'
-    )
-    
-    db.add(new_product)
+    # Create new product; RETURNING replaces the refresh() round-trip
+    new_product = db.execute(
+        insert(Product).values(
+            title=product_data.title,
+            description=product_data.description,
+            price=product_data.price,
+            currency=product_data.currency,
+            category=product_data.category,
+            is_active='active'
+        ).returning(Product)
+    ).scalar_one()
+    
+    # Serialize before commit() expires the instance
+    result = ProductRead.model_validate(new_product)
     db.commit()
-    db.refresh(new_product)
     
-    return ProductRead.from_orm(new_product)
+    return result
 
 
 def get_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Get product by ID
@@ -102,14 +250,15 @@ def get_product(
         HTTPException: If product not found
     """
     product = get_product_by_id(product_id, db)
-    return ProductRead.from_orm(product)
+    return ProductRead.model_validate(product)
 
 
 def get_all_products(
-    db: Session = Depends(get_db),
+    db: Session,
     include_deleted: bool = False,
     include_inactive: bool = False,
-    skip: int = 0,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
     limit: int = 100
 ) -> List[ProductRead]:
     """
@@ -119,7 +268,8 @@ def get_all_products(
         db: Database session
         include_deleted: Whether to include deleted products
         include_inactive: Whether to include inactive products
-        skip: Number of records to skip
+        cursor_created_at: created_at of the last product on the previous page
+        cursor_id: ID of the last product on the previous page
         limit: Maximum number of records to return
         
     Returns:
@@ -133,15 +283,16 @@ def get_all_products(
     if not include_inactive:
         query = query.filter(Product.is_active == 'active')
     
-    products = query.order_by(Product.created_at.desc()).offset(skip).limit(limit).all()
+    products = apply_product_cursor(query, cursor_created_at, cursor_id).limit(limit).all()
     
-    return [ProductRead.from_orm(product) for product in products]
+    return _PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
 
 
 def search_products(
-    db: Session = Depends(get_db),
+    db: Session,
     filters: Optional[ProductSearch] = None,
-    skip: int = 0,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
     limit: int = 100
 ) -> List[ProductRead]:
     """
@@ -150,56 +301,69 @@ def search_products(
     Args:
         db: Database session
         filters: Search filters
-        skip: Number of records to skip
+        cursor_created_at: created_at of the last product on the previous page
+        cursor_id: ID of the last product on the previous page
         limit: Maximum number of records to return
         
     Returns:
         List of matching products
     """
-    query = db.query(Product).filter(Product.deleted_at.is_(None))
-    
-    # Apply filters if provided
-    if filters:
-        # Search in title and description
-        if filters.search_query:
-            search_pattern = f"%{filters.search_query}%"
-            query = query.filter(
-                or_(
-                    Product.title.ilike(search_pattern),
-                    Product.description.ilike(search_pattern)
-                )
+    filters = filters or ProductSearch()
+    
+    # Default: only active products
+    status = filters.is_active or 'active'
+    
+    # Lambda statements are compiled once per combination of filters;
+    # later calls only rebind the parameter values
+    stmt = lambda_stmt(lambda: select(Product).where(
+        Product.deleted_at.is_(None),
+        Product.is_active == status
+    ))
+    
+    # Search in title and description
+    if filters.search_query:
+        search_pattern = f"%{filters.search_query}%"
+        stmt += lambda s: s.where(
+            or_(
+                Product.title.ilike(search_pattern),
+                Product.description.ilike(search_pattern)
             )
-        
-        if filters.category:
-            query = query.filter(Product.category == filters.category)
-        
-        if filters.min_price is not None:
-            query = query.filter(Product.price >= filters.min_price)
-        
-        if filters.max_price is not None:
-            query = query.filter(Product.price <= filters.max_price)
-        
-        if filters.currency:
-            query = query.filter(Product.currency == filters.currency)
-        
-        if filters.is_active:
-            query = query.filter(Product.is_active == filters.is_active)
-        else:
-            # Default: only active products
-            query = query.filter(Product.is_active == 'active')
-    else:
-        # Default: only active products
-        query = query.filter(Product.is_active == 'active')
+        )
     
-    products = query.order_by(Product.created_at.desc()).offset(skip).limit(limit).all()
+    category = filters.category
+    if category:
+        stmt += lambda s: s.where(Product.category == category)
+    
+    min_price = filters.min_price
+    if min_price is not None:
+        stmt += lambda s: s.where(Product.price >= min_price)
+    
+    max_price = filters.max_price
+    if max_price is not None:
+        stmt += lambda s: s.where(Product.price <= max_price)
+    
+    currency = filters.currency
+    if currency:
+        stmt += lambda s: s.where(Product.currency == currency)
+    
+    check_product_cursor(cursor_created_at, cursor_id)
+    if cursor_id is not None:
+        stmt += lambda s: s.where(
+            tuple_(Product.created_at, Product.id) < tuple_(cursor_created_at, cursor_id)
+        )
     
-    return [ProductRead.from_orm(product) for product in products]
+    stmt += lambda s: s.order_by(Product.created_at.desc(), Product.id.desc()).limit(limit)
+    
+    products = db.execute(stmt).scalars().all()
+    
+    return _PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
 
 
 def get_products_by_category(
     category: str,
-    db: Session = Depends(get_db),
-    skip: int = 0,
+    db: Session,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
     limit: int = 100
 ) -> List[ProductRead]:
     """
@@ -208,33 +372,30 @@ def get_products_by_category(
     Args:
         category: Product category
         db: Database session
-        skip: Number of records to skip
+        cursor_created_at: created_at of the last product on the previous page
+        cursor_id: ID of the last product on the previous page
         limit: Maximum number of records to return
         
     Returns:
         List of products in category
     """
-    # Validate category
-    allowed_categories = ['banking', 'insurance', 'investment', 'cards']
-    if category not in allowed_categories:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid category. Must be one of: {', '.join(allowed_categories)}"
-        )
+    check_category(category)
     
-    products = db.query(Product).filter(
+    query = db.query(Product).filter(
         Product.category == category,
         Product.is_active == 'active',
         Product.deleted_at.is_(None)
-    ).order_by(Product.created_at.desc()).offset(skip).limit(limit).all()
+    )
+    
+    products = apply_product_cursor(query, cursor_created_at, cursor_id).limit(limit).all()
     
-    return [ProductRead.from_orm(product) for product in products]
+    return _PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
 
 
 def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Update product information
@@ -250,25 +411,29 @@ def update_product(
     Raises:
         HTTPException: If product not found
     """
-    product = get_product_by_id(product_id, db, include_inactive=True)
-    
     # Update only provided fields
     update_data = product_data.model_dump(exclude_unset=True)
     
-    for field, value in update_data.items():
-        setattr(product, field, value)
+    product = update_product_row(
+        product_id, db,
+        Product.deleted_at.is_(None),
+        **update_data
+    )
     
-    product.updated_at = datetime.now()
+    if not product:
+        # Raises the matching 404
+        get_product_by_id(product_id, db, include_inactive=True)
+        raise HTTPException(status_code=404, detail="Product not found")
     
+    result = ProductRead.model_validate(product)
     db.commit()
-    db.refresh(product)
     
-    return ProductRead.from_orm(product)
+    return result
 
 
 def delete_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     soft_delete: bool = True
 ) -> dict:
     """
@@ -283,39 +448,62 @@ def delete_product(
         Success message
         
     Raises:
-        HTTPException: If product not found
+        HTTPException: If product not found or still in active carts
     """
-    product = get_product_by_id(product_id, db, include_inactive=True)
+    # Lock the product first: add_to_cart share-locks it, so carts being added
+    # right now are committed before the count below and none can follow it
+    db.query(Product.id).filter(Product.id == product_id).with_for_update().first()
     
-    # Check if product is used in any active carts
-    active_carts = db.query(Cart).filter(
+    # Count active carts and delete in one statement
+    active_carts = select(func.count().label('total')).where(
         Cart.product_id == product_id,
         Cart.status == 'active',
         Cart.deleted_at.is_(None)
-    ).count()
+    ).cte('active_carts')
+    active_total = select(active_carts.c.total).scalar_subquery()
     
-    if active_carts > 0:
+    criteria = (
+        Product.id == product_id,
+        Product.deleted_at.is_(None),
+        active_total == 0
+    )
+    if soft_delete:
+        # Soft delete: mark as deleted and inactive
+        stmt = update(Product).where(*criteria).values(
+            deleted_at=func.now(),
+            is_active='inactive'
+        )
+    else:
+        # Hard delete: remove from database
+        stmt = delete(Product).where(*criteria)
+    changed = stmt.returning(Product.id).cte('changed')
+    
+    active_count, changed_count = db.execute(
+        select(active_total, select(func.count()).select_from(changed).scalar_subquery())
+    ).one()
+    
+    if active_count > 0:
+        db.rollback()
         raise HTTPException(
             status_code=400,
-            detail=f"Cannot delete product. It's in {active_carts} active cart(s). Remove from carts first."
+            detail=f"Cannot delete product. It's in {active_count} active cart(s). Remove from carts first."
         )
     
+    if not changed_count:
+        db.rollback()
+        # Reproduce the precise 404 (missing vs already deleted)
+        get_product_by_id(product_id, db, include_inactive=True)
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    db.commit()
     if soft_delete:
-        # Soft delete: mark as deleted and inactive
-        product.deleted_at = datetime.now()
-        product.is_active = 'inactive'
-        db.commit()
         return {"message": "Product soft deleted successfully"}
-    else:
-        # Hard delete: remove from database
-        db.delete(product)
-        db.commit()
-        return {"message": "Product permanently deleted"}
+    return {"message": "Product permanently deleted"}
 
 
 def restore_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Restore a soft-deleted product
@@ -330,25 +518,27 @@ def restore_product(
     Raises:
         HTTPException: If product not found or not deleted
     """
-    product = get_product_by_id(product_id, db, include_deleted=True, include_inactive=True)
+    # Restore product
+    product = update_product_row(
+        product_id, db,
+        Product.deleted_at.isnot(None),
+        deleted_at=None,
+        is_active='active'
+    )
     
-    if not product.deleted_at:
+    if not product:
+        get_product_by_id(product_id, db, include_deleted=True, include_inactive=True)
         raise HTTPException(status_code=400, detail="Product is not deleted")
     
-    # Restore product
-    product.deleted_at = None
-    product.is_active = 'active'
-    product.updated_at = datetime.now()
-    
+    result = ProductRead.model_validate(product)
     db.commit()
-    db.refresh(product)
     
-    return ProductRead.from_orm(product)
+    return result
 
 
 def activate_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Activate a product
@@ -363,23 +553,26 @@ def activate_product(
     Raises:
         HTTPException: If product not found
     """
-    product = get_product_by_id(product_id, db, include_inactive=True)
+    product = update_product_row(
+        product_id, db,
+        Product.deleted_at.is_(None),
+        Product.is_active != 'active',
+        is_active='active'
+    )
     
-    if product.is_active == 'active':
+    if not product:
+        get_product_by_id(product_id, db, include_inactive=True)
         raise HTTPException(status_code=400, detail="Product is already active")
     
-    product.is_active = 'active'
-    product.updated_at = datetime.now()
-    
+    result = ProductRead.model_validate(product)
     db.commit()
-    db.refresh(product)
     
-    return ProductRead.from_orm(product)
+    return result
 
 
 def deactivate_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductRead:
     """
     Deactivate a product
@@ -394,23 +587,26 @@ def deactivate_product(
     Raises:
         HTTPException: If product not found
     """
-    product = get_product_by_id(product_id, db)
+    product = update_product_row(
+        product_id, db,
+        Product.deleted_at.is_(None),
+        Product.is_active == 'active',
+        is_active='inactive'
+    )
     
-    if product.is_active == 'inactive':
+    if not product:
+        get_product_by_id(product_id, db)
         raise HTTPException(status_code=400, detail="Product is already inactive")
     
-    product.is_active = 'inactive'
-    product.updated_at = datetime.now()
-    
+    result = ProductRead.model_validate(product)
     db.commit()
-    db.refresh(product)
     
-    return ProductRead.from_orm(product)
+    return result
 
 
 def get_product_stats(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> ProductStats:
     """
     Get statistics for a specific product
@@ -427,15 +623,15 @@ def get_product_stats(
     """
     product = get_product_by_id(product_id, db, include_inactive=True)
     
-    # Count purchases from transactions
-    purchases = db.query(Transaction).filter(
+    # Aggregate purchases from transactions
+    total_purchases, total_revenue = db.query(
+        func.count(Transaction.id),
+        func.coalesce(func.sum(Transaction.amount), 0)
+    ).filter(
         Transaction.product_id == product_id,
         Transaction.transaction_type == 'purchase',
         Transaction.deleted_at.is_(None)
-    ).all()
-    
-    total_purchases = len(purchases)
-    total_revenue = sum(t.amount for t in purchases)
+    ).one()
     
     # Count items in active carts
     total_in_carts = db.query(func.sum(Cart.quantity)).filter(
@@ -448,7 +644,7 @@ def get_product_stats(
         product_id=product.id,
         product_title=product.title,
         total_purchases=total_purchases,
-        total_revenue=Decimal(str(total_revenue)),
+        total_revenue=total_revenue,
         currency=product.currency,
         total_in_carts=int(total_in_carts)
     )
@@ -456,7 +652,7 @@ def get_product_stats(
 
 def get_category_stats(
     category: str,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> CategoryStats:
     """
     Get statistics for a product category
@@ -468,53 +664,45 @@ def get_category_stats(
     Returns:
         Category statistics
     """
-    # Validate category
-    allowed_categories = ['banking', 'insurance', 'investment', 'cards']
-    if category not in allowed_categories:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid category. Must be one of: {', '.join(allowed_categories)}"
-        )
-    
-    # Count products
-    total_products = db.query(Product).filter(
-        Product.category == category,
-        Product.deleted_at.is_(None)
-    ).count()
-    
-    active_products = db.query(Product).filter(
-        Product.category == category,
-        Product.is_active == 'active',
-        Product.deleted_at.is_(None)
-    ).count()
+    check_category(category)
     
-    # Get product IDs in this category
-    product_ids = [p.id for p in db.query(Product.id).filter(
+    # Products of the category, scanned once and shared by both aggregates
+    category_products = db.query(Product.id, Product.is_active).filter(
         Product.category == category,
         Product.deleted_at.is_(None)
-    ).all()]
-    
-    # Count purchases
-    purchases = db.query(Transaction).filter(
-        Transaction.product_id.in_(product_ids),
+    ).cte('category_products')
+    
+    product_counts = db.query(
+        func.count().label('total_products'),
+        func.count().filter(category_products.c.is_active == 'active').label('active_products')
+    ).select_from(category_products).subquery()
+    
+    purchase_totals = db.query(
+        func.count(Transaction.id).label('total_purchases'),
+        func.coalesce(func.sum(Transaction.amount), 0).label('total_revenue')
+    ).join(
+        category_products, category_products.c.id == Transaction.product_id
+    ).filter(
         Transaction.transaction_type == 'purchase',
         Transaction.deleted_at.is_(None)
-    ).all()
+    ).subquery()
     
-    total_purchases = len(purchases)
-    total_revenue = sum(t.amount for t in purchases)
+    # Single round-trip for all category statistics
+    stats = db.query(product_counts, purchase_totals).select_from(
+        product_counts
+    ).join(purchase_totals, true()).one()
     
     return CategoryStats(
         category=category,
-        total_products=total_products,
-        active_products=active_products,
-        total_purchases=total_purchases,
-        total_revenue=Decimal(str(total_revenue))
+        total_products=stats.total_products,
+        active_products=stats.active_products,
+        total_purchases=stats.total_purchases,
+        total_revenue=stats.total_revenue
     )
 
 
 def get_featured_products(
-    db: Session = Depends(get_db),
+    db: Session,
     limit: int = 10
 ) -> List[ProductRead]:
     """
@@ -527,21 +715,11 @@ def get_featured_products(
     Returns:
         List of featured products
     """
-    # Get products with purchase counts
-    product_purchases = db.query(
-        Product,
-        func.count(Transaction.id).label('purchase_count')
-    ).outerjoin(
-        Transaction,
-        (Transaction.product_id == Product.id) & 
-        (Transaction.transaction_type == 'purchase') &
-        (Transaction.deleted_at.is_(None))
-    ).filter(
+    # purchase_count is maintained on every purchase, no join needed
+    products = db.query(Product).filter(
         Product.is_active == 'active',
         Product.deleted_at.is_(None)
-    ).group_by(Product.id).order_by(
-        func.count(Transaction.id).desc()
-    ).limit(limit).all()
+    ).order_by(Product.purchase_count.desc()).limit(limit).all()
     
-    return [ProductRead.from_orm(product) for product, _ in product_purchases]
+    return _PRODUCT_LIST_ADAPTER.validate_python(products, from_attributes=True)
 
@@ -1,6 +1,7 @@
-from fastapi import APIRouter, Depends, Query, Path, Body
-from sqlalchemy.orm import Session
-from database import get_db
+from fastapi import APIRouter, Depends, Query, Path, Body, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from cache import cache_get_or_set, cache_invalidate
 from services.transaction import service
 from services.transaction.schemas import (
     TransactionDeposit,
@@ -10,19 +11,66 @@ from services.transaction.schemas import (
     TransactionUpdate,
     TransactionRead,
     TransactionHistoryFilter,
-    TransactionStats
+    TransactionStats,
+    TransactionPage
 )
-from typing import List, Optional
+from typing import Annotated, List, Optional
 from datetime import datetime
+from decimal import Decimal
+import hashlib
+import orjson
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
+# Cached reads are dropped on every write (see invalidate_cache and
+# service.invalidate_transaction_cache); the TTL only bounds staleness
+CACHE_TTL = 60
+
+
+def dump_page(rows: List[dict], limit: int) -> bytes:
+    """Serialize a page of transaction row dicts with orjson (Decimal amounts become strings)"""
+    return orjson.dumps(service.build_transaction_page(rows, limit), default=str)
+
+
+def json_response(payload: bytes) -> Response:
+    """Wrap an already serialized JSON body without re-encoding it"""
+    return Response(content=payload, media_type="application/json")
+
+
+def prefers_minimal(prefer: Optional[str]) -> bool:
+    """Whether the client sent an RFC 7240 `Prefer: return=minimal` header"""
+    if not prefer:
+        return False
+    return any(
+        token.strip().lower() == "return=minimal"
+        for preference in prefer.split(",")
+        for token in preference.split(";")[:1]
+    )
+
+
+def minimal_created_response(transaction_id: int) -> Response:
+    """201 response carrying only the new transaction's ID"""
+    return Response(
+        content=orjson.dumps({"id": transaction_id}),
+        status_code=201,
+        media_type="application/json",
+        headers={"Preference-Applied": "return=minimal"}
+    )
+
+
+async def invalidate_cache(*user_ids: Optional[int], transaction_id: Optional[int] = None) -> None:
+    """Drop cached reads affected by a write without blocking the event loop"""
+    await cache_invalidate(
+        *service.transaction_cache_patterns(*user_ids, transaction_id=transaction_id)
+    )
+
 
 @router.post("/deposit", response_model=TransactionRead, status_code=201)
-def create_deposit(
+async def create_deposit(
     deposit_data: TransactionDeposit,
-    user_id: int = Query(..., gt=0, description="User ID performing the deposit"),
-    db: Session = Depends(get_db)
+    user_id: Annotated[int, Query(gt=0, description="User ID performing the deposit")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    prefer: Annotated[Optional[str], Header(description="Send 'return=minimal' to get only the new transaction ID back")] = None
 ):
     """
     Create a deposit transaction.
@@ -37,14 +85,21 @@ def create_deposit(
     **Optional fields:**
     - description: Transaction description
     """
-    return service.create_deposit(deposit_data, user_id, db)
+    transaction = await db.run_sync(
+        lambda session: service.create_deposit(deposit_data, user_id, session)
+    )
+    await invalidate_cache(transaction.user_id, transaction.to_user_id)
+    if prefers_minimal(prefer):
+        return minimal_created_response(transaction.id)
+    return transaction
 
 
 @router.post("/withdrawal", response_model=TransactionRead, status_code=201)
-def create_withdrawal(
+async def create_withdrawal(
     withdrawal_data: TransactionWithdrawal,
-    user_id: int = Query(..., gt=0, description="User ID performing the withdrawal"),
-    db: Session = Depends(get_db)
+    user_id: Annotated[int, Query(gt=0, description="User ID performing the withdrawal")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    prefer: Annotated[Optional[str], Header(description="Send 'return=minimal' to get only the new transaction ID back")] = None
 ):
     """
     Create a withdrawal transaction.
@@ -61,14 +116,21 @@ def create_withdrawal(
     
     **Note:** Account must have sufficient funds.
     """
-    return service.create_withdrawal(withdrawal_data, user_id, db)
+    transaction = await db.run_sync(
+        lambda session: service.create_withdrawal(withdrawal_data, user_id, session)
+    )
+    await invalidate_cache(transaction.user_id, transaction.to_user_id)
+    if prefers_minimal(prefer):
+        return minimal_created_response(transaction.id)
+    return transaction
 
 
 @router.post("/transfer", response_model=TransactionRead, status_code=201)
-def create_transfer(
+async def create_transfer(
     transfer_data: TransactionTransfer,
-    user_id: int = Query(..., gt=0, description="User ID performing the transfer"),
-    db: Session = Depends(get_db)
+    user_id: Annotated[int, Query(gt=0, description="User ID performing the transfer")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    prefer: Annotated[Optional[str], Header(description="Send 'return=minimal' to get only the new transaction ID back")] = None
 ):
     """
     Create a transfer between two accounts.
@@ -86,14 +148,21 @@ def create_transfer(
     
     **Note:** Both accounts must use the same currency and source account must have sufficient funds.
     """
-    return service.create_transfer(transfer_data, user_id, db)
+    transaction = await db.run_sync(
+        lambda session: service.create_transfer(transfer_data, user_id, session)
+    )
+    await invalidate_cache(transaction.user_id, transaction.to_user_id)
+    if prefers_minimal(prefer):
+        return minimal_created_response(transaction.id)
+    return transaction
 
 
 @router.post("/purchase", response_model=TransactionRead, status_code=201)
-def create_purchase(
+async def create_purchase(
     purchase_data: TransactionPurchase,
-    user_id: int = Query(..., gt=0, description="User ID making the purchase"),
-    db: Session = Depends(get_db)
+    user_id: Annotated[int, Query(gt=0, description="User ID making the purchase")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    prefer: Annotated[Optional[str], Header(description="Send 'return=minimal' to get only the new transaction ID back")] = None
 ):
     """
     Create a purchase transaction.
@@ -112,33 +181,47 @@ def create_purchase(
     
     **Note:** Account must have sufficient funds and currency must match product currency.
     """
-    return service.create_purchase(purchase_data, user_id, db)
+    transaction = await db.run_sync(
+        lambda session: service.create_purchase(purchase_data, user_id, session)
+    )
+    await invalidate_cache(transaction.user_id, transaction.to_user_id)
+    if prefers_minimal(prefer):
+        return minimal_created_response(transaction.id)
+    return transaction
 
 
 @router.get("/{transaction_id}", response_model=TransactionRead)
-def get_transaction(
-    transaction_id: int = Path(..., gt=0, description="Transaction ID"),
-    db: Session = Depends(get_db)
+async def get_transaction(
+    transaction_id: Annotated[int, Path(gt=0, description="Transaction ID")],
+    db: Annotated[AsyncSession, Depends(get_async_db)]
 ):
     """
     Get transaction details by ID.
     """
-    return service.get_transaction(transaction_id, db)
-
-
-@router.get("/user/{user_id}", response_model=List[TransactionRead])
-def get_user_transactions(
-    user_id: int = Path(..., gt=0, description="User ID"),
-    account_id: Optional[int] = Query(None, gt=0, description="Filter by account ID"),
-    transaction_type: Optional[str] = Query(None, description="Filter by transaction type"),
-    min_amount: Optional[float] = Query(None, ge=0, description="Minimum amount"),
-    max_amount: Optional[float] = Query(None, ge=0, description="Maximum amount"),
-    date_from: Optional[datetime] = Query(None, description="Start date (ISO format)"),
-    date_to: Optional[datetime] = Query(None, description="End date (ISO format)"),
-    include_deleted: bool = Query(False, description="Include deleted transactions"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
-    db: Session = Depends(get_db)
+    async def load() -> bytes:
+        transaction = await db.run_sync(
+            lambda session: service.get_transaction(transaction_id, session)
+        )
+        return transaction.model_dump_json().encode()
+    
+    payload = await cache_get_or_set(f"tx:{transaction_id}", CACHE_TTL, load)
+    return json_response(payload)
+
+
+@router.get("/user/{user_id}", response_model=TransactionPage)
+async def get_user_transactions(
+    user_id: Annotated[int, Path(gt=0, description="User ID")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    account_id: Annotated[Optional[int], Query(gt=0, description="Filter by account ID")] = None,
+    transaction_type: Annotated[Optional[str], Query(description="Filter by transaction type")] = None,
+    min_amount: Annotated[Optional[Decimal], Query(ge=0, description="Minimum amount")] = None,
+    max_amount: Annotated[Optional[Decimal], Query(ge=0, description="Maximum amount")] = None,
+    date_from: Annotated[Optional[datetime], Query(description="Start date (ISO format)")] = None,
+    date_to: Annotated[Optional[datetime], Query(description="End date (ISO format)")] = None,
+    include_deleted: Annotated[bool, Query(description="Include deleted transactions")] = False,
+    cursor_created_at: Annotated[Optional[datetime], Query(description="created_at of the last transaction on the previous page")] = None,
+    cursor_id: Annotated[Optional[int], Query(gt=0, description="ID of the last transaction on the previous page")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000, description="Maximum number of records to return")] = 100
 ):
     """
     Get all transactions for a specific user with optional filters.
@@ -151,34 +234,52 @@ def get_user_transactions(
     - date_from: Start date for filtering
     - date_to: End date for filtering
     - include_deleted: Include soft-deleted transactions
-    - skip: Pagination offset
+    - cursor_created_at, cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum results to return
     
     Returns transactions where user is either sender or receiver (for transfers).
     """
-    from decimal import Decimal
-    
-    # Build filters
-    filters = TransactionHistoryFilter(
-        account_id=account_id,
-        transaction_type=transaction_type,
-        min_amount=Decimal(str(min_amount)) if min_amount is not None else None,
-        max_amount=Decimal(str(max_amount)) if max_amount is not None else None,
-        date_from=date_from,
-        date_to=date_to
-    )
+    # Build filters only when one is given; the unfiltered history is the common case
+    filters = None
+    filter_hash = "all"
+    if any(value is not None for value in (
+        account_id, transaction_type, min_amount, max_amount, date_from, date_to
+    )):
+        filters = TransactionHistoryFilter(
+            account_id=account_id,
+            transaction_type=transaction_type,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            date_from=date_from,
+            date_to=date_to
+        )
+        filter_hash = hashlib.blake2b(filters.model_dump_json().encode(), digest_size=8).hexdigest()
     
-    return service.get_user_transactions(user_id, db, filters, include_deleted, skip, limit)
+    async def load() -> bytes:
+        rows = await db.run_sync(
+            lambda session: service.get_user_transaction_rows(
+                user_id, session, filters, include_deleted, cursor_created_at, cursor_id, limit
+            )
+        )
+        return dump_page(rows, limit)
+    
+    payload = await cache_get_or_set(
+        f"tx:user:{user_id}:list:{filter_hash}:{include_deleted}:{cursor_created_at}:{cursor_id}:{limit}",
+        CACHE_TTL,
+        load
+    )
+    return json_response(payload)
 
 
-@router.get("/account/{account_id}/history", response_model=List[TransactionRead])
-def get_account_transactions(
-    account_id: int = Path(..., gt=0, description="Account ID"),
-    user_id: int = Query(..., gt=0, description="User ID (for permission check)"),
-    include_deleted: bool = Query(False, description="Include deleted transactions"),
-    skip: int = Query(0, ge=0, description="Number of records to skip"),
-    limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
-    db: Session = Depends(get_db)
+@router.get("/account/{account_id}/history", response_model=TransactionPage)
+async def get_account_transactions(
+    account_id: Annotated[int, Path(gt=0, description="Account ID")],
+    user_id: Annotated[int, Query(gt=0, description="User ID (for permission check)")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    include_deleted: Annotated[bool, Query(description="Include deleted transactions")] = False,
+    cursor_created_at: Annotated[Optional[datetime], Query(description="created_at of the last transaction on the previous page")] = None,
+    cursor_id: Annotated[Optional[int], Query(gt=0, description="ID of the last transaction on the previous page")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000, description="Maximum number of records to return")] = 100
 ):
     """
     Get transaction history for a specific account.
@@ -186,20 +287,34 @@ def get_account_transactions(
     **Query parameters:**
     - user_id: User ID for permission verification
     - include_deleted: Include soft-deleted transactions
-    - skip: Pagination offset
+    - cursor_created_at, cursor_id: Cursor from the previous page's next_cursor
     - limit: Maximum results to return
     
     Returns transactions where the account is either source or destination.
     """
-    return service.get_account_transactions(account_id, user_id, db, include_deleted, skip, limit)
+    async def load() -> bytes:
+        rows = await db.run_sync(
+            lambda session: service.get_account_transaction_rows(
+                account_id, user_id, session, include_deleted, cursor_created_at, cursor_id, limit
+            )
+        )
+        return dump_page(rows, limit)
+    
+    # Keyed under the owner so that any write by or to them drops it
+    payload = await cache_get_or_set(
+        f"tx:user:{user_id}:account:{account_id}:{include_deleted}:{cursor_created_at}:{cursor_id}:{limit}",
+        CACHE_TTL,
+        load
+    )
+    return json_response(payload)
 
 
 @router.put("/{transaction_id}", response_model=TransactionRead)
-def update_transaction(
-    transaction_id: int = Path(..., gt=0, description="Transaction ID"),
-    user_id: int = Query(..., gt=0, description="User ID (for permission check)"),
-    transaction_data: TransactionUpdate = Body(...),
-    db: Session = Depends(get_db)
+async def update_transaction(
+    transaction_id: Annotated[int, Path(gt=0, description="Transaction ID")],
+    user_id: Annotated[int, Query(gt=0, description="User ID (for permission check)")],
+    transaction_data: Annotated[TransactionUpdate, Body()],
+    db: Annotated[AsyncSession, Depends(get_async_db)]
 ):
     """
     Update transaction description.
@@ -210,14 +325,18 @@ def update_transaction(
     **Query parameters:**
     - user_id: User ID for permission verification (must own the transaction)
     """
-    return service.update_transaction(transaction_id, user_id, transaction_data, db)
+    transaction = await db.run_sync(
+        lambda session: service.update_transaction(transaction_id, user_id, transaction_data, session)
+    )
+    await invalidate_cache(transaction.user_id, transaction.to_user_id, transaction_id=transaction_id)
+    return transaction
 
 
-@router.delete("/{transaction_id}")
-def delete_transaction(
-    transaction_id: int = Path(..., gt=0, description="Transaction ID"),
-    user_id: int = Query(..., gt=0, description="User ID (for permission check)"),
-    db: Session = Depends(get_db)
+@router.delete("/{transaction_id}", status_code=204, response_class=Response)
+async def delete_transaction(
+    transaction_id: Annotated[int, Path(gt=0, description="Transaction ID")],
+    user_id: Annotated[int, Query(gt=0, description="User ID (for permission check)")],
+    db: Annotated[AsyncSession, Depends(get_async_db)]
 ):
     """
     Soft delete a transaction.
@@ -227,17 +346,27 @@ def delete_transaction(
     
     **Query parameters:**
     - user_id: User ID for permission verification (must own the transaction)
+    
+    Returns 204 No Content on success.
     """
-    return service.delete_transaction(transaction_id, user_id, db)
+    def delete(session):
+        service.delete_transaction(transaction_id, user_id, session)
+        # The recipient's cached history has to go too
+        transaction = service.get_transaction_by_id(transaction_id, session, include_deleted=True)
+        return transaction.to_user_id
+    
+    to_user_id = await db.run_sync(delete)
+    await invalidate_cache(user_id, to_user_id, transaction_id=transaction_id)
+    return Response(status_code=204)
 
 
 @router.get("/user/{user_id}/stats", response_model=TransactionStats)
-def get_user_transaction_stats(
-    user_id: int = Path(..., gt=0, description="User ID"),
-    currency: str = Query(..., description="Currency code for statistics"),
-    date_from: Optional[datetime] = Query(None, description="Start date (ISO format)"),
-    date_to: Optional[datetime] = Query(None, description="End date (ISO format)"),
-    db: Session = Depends(get_db)
+async def get_user_transaction_stats(
+    user_id: Annotated[int, Path(gt=0, description="User ID")],
+    currency: Annotated[str, Query(description="Currency code for statistics")],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    date_from: Annotated[Optional[datetime], Query(description="Start date (ISO format)")] = None,
+    date_to: Annotated[Optional[datetime], Query(description="End date (ISO format)")] = None
 ):
     """
     Get transaction statistics for a user.
@@ -255,5 +384,18 @@ def get_user_transaction_stats(
     - date_from: Start date for statistics period
     - date_to: End date for statistics period
     """
-    return service.get_user_transaction_stats(user_id, currency, db, date_from, date_to)
+    async def load() -> bytes:
+        stats = await db.run_sync(
+            lambda session: service.get_user_transaction_stats(
+                user_id, currency, session, date_from, date_to
+            )
+        )
+        return stats.model_dump_json().encode()
+    
+    payload = await cache_get_or_set(
+        f"tx:user:{user_id}:stats:{currency}:{date_from}:{date_to}",
+        CACHE_TTL,
+        load
+    )
+    return json_response(payload)
 
@@ -1,22 +1,50 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, field_validator
 from datetime import datetime
-from typing import Optional
-from decimal import Decimal
+from typing import Annotated, List, Optional
+from decimal import Decimal, ROUND_HALF_UP
+
+
+_CENT = Decimal('0.01')
+_KZT = 'KZT'
+_ALLOWED_TYPES = frozenset({'transfer', 'purchase', 'deposit', 'withdrawal'})
+_TRANSACTION_TYPE_ERROR = "Transaction type must be one of: transfer, purchase, deposit, withdrawal"
+
+
+def _check_kzt(v: str) -> str:
+    # Clients almost always send the canonical code already
+    if v == _KZT:
+        return v
+    v = v.upper()
+    if v != _KZT:
+        raise ValueError("Currency must be 'KZT'")
+    return v
+
+
+def _check_transaction_type(v: Optional[str]) -> Optional[str]:
+    if v is not None and v not in _ALLOWED_TYPES:
+        raise ValueError(_TRANSACTION_TYPE_ERROR)
+    return v
+
+
+def _quantize_money(v: Decimal) -> Decimal:
+    # Round to tiyn the way a NUMERIC(15, 2) column would store it
+    return v.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+# Plain-function validators are attached to the field's core schema once
+KZTCurrency = Annotated[str, AfterValidator(_check_kzt)]
+TransactionType = Annotated[Optional[str], AfterValidator(_check_transaction_type)]
+Money = Annotated[Decimal, AfterValidator(_quantize_money)]
+PositiveMoney = Annotated[Money, Field(gt=0)]
 
 
 class TransactionBase(BaseModel):
     """Base schema for transaction"""
-    amount: Decimal = Field(..., gt=0, description="Transaction amount (must be positive)")
-    currency: str = Field(..., description="Currency code: 'KZT'")
-    description: Optional[str] = Field(None, max_length=500, description="Transaction description")
+    model_config = ConfigDict(frozen=True, extra='forbid')
     
-    @field_validator('currency')
-    @classmethod
-    def validate_currency(cls, v: str) -> str:
-        v = v.upper()
-        if v != 'KZT':
-            raise ValueError("Currency must be 'KZT'")
-        return v
+    amount: PositiveMoney = Field(..., description="Transaction amount (must be positive)")
+    currency: KZTCurrency = Field(..., description="Currency code: 'KZT'")
+    description: Optional[str] = Field(None, max_length=500, description="Transaction description")
 
 
 class TransactionDeposit(TransactionBase):
@@ -52,11 +80,15 @@ class TransactionPurchase(TransactionBase):
 
 class TransactionUpdate(BaseModel):
     """Schema for updating transaction"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     description: Optional[str] = Field(None, max_length=500, description="Updated description")
 
 
 class TransactionRead(BaseModel):
     """Schema for reading transaction data"""
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     user_id: int
     account_id: int
@@ -71,36 +103,43 @@ class TransactionRead(BaseModel):
     updated_at: datetime
     deleted_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+
+class TransactionCursor(BaseModel):
+    """Keyset pagination cursor: the last transaction of a page"""
+    created_at: datetime
+    id: int
+
+
+class TransactionPage(BaseModel):
+    """Schema for a page of transactions"""
+    items: List[TransactionRead]
+    next_cursor: Optional[TransactionCursor] = None
 
 
 class TransactionHistoryFilter(BaseModel):
     """Schema for filtering transaction history"""
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     account_id: Optional[int] = Field(None, gt=0, description="Filter by account ID")
-    transaction_type: Optional[str] = Field(None, description="Filter by transaction type")
+    transaction_type: TransactionType = Field(None, description="Filter by transaction type")
     min_amount: Optional[Decimal] = Field(None, ge=0, description="Minimum amount")
     max_amount: Optional[Decimal] = Field(None, ge=0, description="Maximum amount")
     date_from: Optional[datetime] = Field(None, description="Start date")
     date_to: Optional[datetime] = Field(None, description="End date")
-    
-    @field_validator('transaction_type')
-    @classmethod
-    def validate_transaction_type(cls, v: Optional[str]) -> Optional[str]:
-        if v is not None:
-            allowed_types = ['transfer', 'purchase', 'deposit', 'withdrawal']
-            if v not in allowed_types:
-                raise ValueError(f"Transaction type must be one of: {', '.join(allowed_types)}")
-        return v
 
 
 class TransactionStats(BaseModel):
     """Schema for transaction statistics"""
     total_transactions: int
-    total_deposits: Decimal
-    total_withdrawals: Decimal
-    total_transfers_sent: Decimal
-    total_transfers_received: Decimal
-    total_purchases: Decimal
+    total_deposits: Money
+    total_withdrawals: Money
+    total_transfers_sent: Money
+    total_transfers_received: Money
+    total_purchases: Money
+    deposits_count: int = 0
+    withdrawals_count: int = 0
+    transfers_sent_count: int = 0
+    transfers_received_count: int = 0
+    purchases_count: int = 0
     currency: str
 
@@ -1,7 +1,7 @@
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from database import get_db
+from sqlalchemy import and_, or_, func, insert, lambda_stmt, literal, select, tuple_, update
+from cache import cache_invalidate_sync
 from models.transaction import Transaction
 from models.account import Account
 from models.user import User
@@ -21,6 +21,51 @@ from datetime import datetime
 from decimal import Decimal
 
 
+# A balance UPDATE refused by its guards but whose re-read finds nothing wrong
+# lost a race with another write; it is retried this many times before a 409
+BALANCE_UPDATE_ATTEMPTS = 3
+
+# History endpoints select just these columns and skip ORM/pydantic objects
+_TRANSACTION_READ_COLUMNS = tuple(
+    getattr(Transaction, name) for name in TransactionRead.model_fields
+)
+
+
+def transaction_cache_patterns(
+    *user_ids: Optional[int],
+    transaction_id: Optional[int] = None
+) -> List[str]:
+    """
+    Cache key patterns for transaction reads affected by a write
+    
+    Args:
+        *user_ids: Users whose history and stats changed (None values are ignored)
+        transaction_id: Transaction whose cached details changed
+        
+    Returns:
+        Key patterns to invalidate
+    """
+    patterns = [f"tx:user:{uid}:*" for uid in user_ids if uid is not None]
+    if transaction_id is not None:
+        patterns.append(f"tx:{transaction_id}")
+    return patterns
+
+
+def invalidate_transaction_cache(
+    *user_ids: Optional[int],
+    transaction_id: Optional[int] = None
+) -> None:
+    """
+    Drop cached transaction reads from synchronous callers (the async router
+    invalidates on its own so that it never blocks the event loop)
+    
+    Args:
+        *user_ids: Users whose history and stats changed
+        transaction_id: Transaction whose cached details changed
+    """
+    cache_invalidate_sync(*transaction_cache_patterns(*user_ids, transaction_id=transaction_id))
+
+
 def get_transaction_by_id(
     transaction_id: int, 
     db: Session, 
@@ -66,7 +111,44 @@ def verify_account_exists_and_active(account_id: int, db: Session) -> Account:
         HTTPException: If account not found, deleted, or not active
     """
     account = db.query(Account).filter(Account.id == account_id).first()
+    return check_account_active(account, account_id)
+
+
+def verify_accounts_exist_and_active(account_ids: List[int], db: Session) -> List[Account]:
+    """
+    Verify several accounts with a single query
     
+    Args:
+        account_ids: Account IDs, checked in this order
+        db: Database session
+        
+    Returns:
+        Account objects in the order of account_ids
+        
+    Raises:
+        HTTPException: If an account is not found, deleted, or not active
+    """
+    accounts = {
+        account.id: account
+        for account in db.query(Account).filter(Account.id.in_(account_ids))
+    }
+    return [check_account_active(accounts.get(account_id), account_id) for account_id in account_ids]
+
+
+def check_account_active(account: Optional[Account], account_id: int) -> Account:
+    """
+    Check that an already loaded account exists, is not deleted, and is active
+    
+    Args:
+        account: Loaded account, or None if no row was found
+        account_id: Account ID (for error messages)
+        
+    Returns:
+        Account object
+        
+    Raises:
+        HTTPException: If account not found, deleted, or not active
+    """
     if not account:
         raise HTTPException(status_code=404, detail=f"Account {account_id} not found")
     
@@ -110,10 +192,131 @@ def verify_product_exists_and_active(product_id: int, db: Session) -> Product:
     return product
 
 
+def insert_transaction(db: Session, **values) -> TransactionRead:
+    """
+    Insert a transaction and commit, reading the new row back via RETURNING
+    
+    Args:
+        db: Database session
+        **values: Transaction column values
+        
+    Returns:
+        Created transaction data
+    """
+    row = db.execute(
+        insert(Transaction).values(**values).returning(*_TRANSACTION_READ_COLUMNS)
+    ).one()
+    db.commit()
+    
+    return TransactionRead.model_validate(row._asdict())
+
+
+def adjust_account_balance(
+    db: Session,
+    account_id: int,
+    amount: Decimal,
+    currency: str,
+    user_id: Optional[int] = None,
+    debit: bool = False
+) -> Optional[int]:
+    """
+    Atomically credit or debit an active account with a single UPDATE
+    
+    Args:
+        db: Database session
+        account_id: Account ID
+        amount: Amount to add or subtract
+        currency: Currency the account must hold
+        user_id: User who must own the account (None to skip the check)
+        debit: Subtract the amount; the balance must cover it
+        
+    Returns:
+        Owner user ID of the updated account, or None if any condition failed
+    """
+    conditions = [
+        Account.id == account_id,
+        Account.status == 'active',
+        Account.deleted_at.is_(None),
+        Account.currency == currency
+    ]
+    if user_id is not None:
+        conditions.append(Account.user_id == user_id)
+    
+    if debit:
+        conditions.append(Account.balance >= amount)
+        balance = Account.balance - amount
+    else:
+        balance = Account.balance + amount
+    
+    return db.execute(
+        update(Account)
+        .where(*conditions)
+        .values(balance=balance)
+        .returning(Account.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+
+def raise_account_conflict(account_id: int) -> None:
+    """
+    Raise when balance updates keep being refused although re-reads find nothing wrong
+    
+    Args:
+        account_id: Account ID
+        
+    Raises:
+        HTTPException: Always (409), the account kept changing in between
+    """
+    raise HTTPException(
+        status_code=409,
+        detail=f"Account {account_id} was modified concurrently, please retry"
+    )
+
+
+def check_refused_balance_update(
+    account: Account,
+    currency: str,
+    user_id: Optional[int] = None,
+    amount: Optional[Decimal] = None,
+    role: Optional[str] = None
+) -> None:
+    """
+    Raise the error for the guard a refused balance UPDATE failed on
+    
+    Args:
+        account: Account re-read after the rollback
+        currency: Transaction currency
+        user_id: Owner the UPDATE required, if any
+        amount: Amount the UPDATE debited, if it was a debit
+        role: 'source' or 'destination' for transfers
+        
+    Raises:
+        HTTPException: If the account isn't owned by the user, uses another
+            currency, or can't cover the debit; returns normally if every
+            check passes (the UPDATE lost a race and can be retried)
+    """
+    if user_id is not None and account.user_id != user_id:
+        owned = f"the {role} account" if role else "this account"
+        raise HTTPException(status_code=403, detail=f"You don't own {owned}")
+    
+    if account.currency != currency:
+        if role:
+            detail = f"Currency mismatch. {role.capitalize()} account uses {account.currency}"
+        else:
+            detail = f"Currency mismatch. Account uses {account.currency}, transaction uses {currency}"
+        raise HTTPException(status_code=400, detail=detail)
+    
+    if amount is not None and account.balance < amount:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient funds. Current balance: {account.balance} {account.currency}"
+        )
+
+
 def create_deposit(
     deposit_data: TransactionDeposit,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Create a deposit transaction
@@ -129,26 +332,26 @@ def create_deposit(
     Raises:
         HTTPException: If validation fails
     """
-    # Verify account
-    account = verify_account_exists_and_active(deposit_data.account_id, db)
-    
-    # Verify user owns the account
-    if account.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own this account")
-    
-    # Verify currency matches
-    if account.currency != deposit_data.currency:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Currency mismatch. Account uses {account.currency}, transaction uses {deposit_data.currency}"
+    # Update account balance; the UPDATE only matches an active account
+    # owned by the user in the transaction currency
+    for _ in range(BALANCE_UPDATE_ATTEMPTS):
+        credited = adjust_account_balance(
+            db, deposit_data.account_id, deposit_data.amount, deposit_data.currency,
+            user_id=user_id
         )
-    
-    # Update account balance
-    account.balance += deposit_data.amount
-    account.updated_at = datetime.now()
-    
-    # Create transaction
-    new_transaction = Transaction(
+        if credited is not None:
+            break
+        
+        # Work out which check failed; if none did, try again
+        db.rollback()
+        account = verify_account_exists_and_active(deposit_data.account_id, db)
+        check_refused_balance_update(account, deposit_data.currency, user_id=user_id)
+    else:
+        raise_account_conflict(deposit_data.account_id)
+    
+    # Create transaction in the same commit as the balance update
+    return insert_transaction(
+        db,
         user_id=user_id,
         account_id=deposit_data.account_id,
         amount=deposit_data.amount,
@@ -156,18 +359,12 @@ def create_deposit(
         transaction_type='deposit',
         description=deposit_data.description or f"Deposit to account {deposit_data.account_id}"
     )
-    
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-    
-    return TransactionRead.from_orm(new_transaction)
 
 
 def create_withdrawal(
     withdrawal_data: TransactionWithdrawal,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Create a withdrawal transaction
@@ -183,33 +380,27 @@ def create_withdrawal(
     Raises:
         HTTPException: If validation fails or insufficient funds
     """
-    # Verify account
-    account = verify_account_exists_and_active(withdrawal_data.account_id, db)
-    
-    # Verify user owns the account
-    if account.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own this account")
-    
-    # Verify currency matches
-    if account.currency != withdrawal_data.currency:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Currency mismatch. Account uses {account.currency}, transaction uses {withdrawal_data.currency}"
+    # Update account balance; the UPDATE matches nothing if funds are short
+    for _ in range(BALANCE_UPDATE_ATTEMPTS):
+        debited = adjust_account_balance(
+            db, withdrawal_data.account_id, withdrawal_data.amount, withdrawal_data.currency,
+            user_id=user_id, debit=True
         )
-    
-    # Check sufficient funds
-    if account.balance < withdrawal_data.amount:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient funds. Current balance: {account.balance} {account.currency}"
+        if debited is not None:
+            break
+        
+        # Work out which check failed; if none did, try again
+        db.rollback()
+        account = verify_account_exists_and_active(withdrawal_data.account_id, db)
+        check_refused_balance_update(
+            account, withdrawal_data.currency, user_id=user_id, amount=withdrawal_data.amount
         )
+    else:
+        raise_account_conflict(withdrawal_data.account_id)
     
-    # Update account balance
-    account.balance -= withdrawal_data.amount
-    account.updated_at = datetime.now()
-    
-    # Create transaction
-    new_transaction = Transaction(
+    # Create transaction in the same commit as the balance update
+    return insert_transaction(
+        db,
         user_id=user_id,
         account_id=withdrawal_data.account_id,
         amount=withdrawal_data.amount,
@@ -217,18 +408,12 @@ def create_withdrawal(
         transaction_type='withdrawal',
         description=withdrawal_data.description or f"Withdrawal from account {withdrawal_data.account_id}"
     )
-    
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-    
-    return TransactionRead.from_orm(new_transaction)
 
 
 def create_transfer(
     transfer_data: TransactionTransfer,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Create a transfer between accounts
@@ -244,64 +429,56 @@ def create_transfer(
     Raises:
         HTTPException: If validation fails or insufficient funds
     """
-    # Verify both accounts
-    from_account = verify_account_exists_and_active(transfer_data.from_account_id, db)
-    to_account = verify_account_exists_and_active(transfer_data.to_account_id, db)
-    
-    # Verify user owns the source account
-    if from_account.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own the source account")
-    
-    # Verify currency matches
-    if from_account.currency != transfer_data.currency:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Currency mismatch. Source account uses {from_account.currency}"
-        )
-    
-    if to_account.currency != transfer_data.currency:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Currency mismatch. Destination account uses {to_account.currency}"
-        )
-    
-    # Check sufficient funds
-    if from_account.balance < transfer_data.amount:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient funds. Current balance: {from_account.balance} {from_account.currency}"
+    from_id = transfer_data.from_account_id
+    to_id = transfer_data.to_account_id
+    amount = transfer_data.amount
+    currency = transfer_data.currency
+    
+    # Update both balances, lower account id first so concurrent transfers
+    # in opposite directions take the row locks in the same order
+    updates = {
+        from_id: lambda: adjust_account_balance(
+            db, from_id, amount, currency, user_id=user_id, debit=True
+        ),
+        to_id: lambda: adjust_account_balance(db, to_id, amount, currency)
+    }
+    for _ in range(BALANCE_UPDATE_ATTEMPTS):
+        owners = {}
+        for account_id in sorted(updates):
+            owners[account_id] = updates[account_id]()
+            if owners[account_id] is None:
+                break
+        else:
+            break
+        
+        # Work out which check failed; if none did, try again
+        db.rollback()
+        from_account, to_account = verify_accounts_exist_and_active([from_id, to_id], db)
+        check_refused_balance_update(
+            from_account, currency, user_id=user_id, amount=amount, role='source'
         )
+        check_refused_balance_update(to_account, currency, role='destination')
+    else:
+        raise_account_conflict(from_id)
     
-    # Update account balances
-    from_account.balance -= transfer_data.amount
-    from_account.updated_at = datetime.now()
-    
-    to_account.balance += transfer_data.amount
-    to_account.updated_at = datetime.now()
-    
-    # Create transaction
-    new_transaction = Transaction(
+    # Create transaction in the same commit as the balance updates
+    return insert_transaction(
+        db,
         user_id=user_id,
-        account_id=transfer_data.from_account_id,
-        amount=transfer_data.amount,
-        currency=transfer_data.currency,
+        account_id=from_id,
+        amount=amount,
+        currency=currency,
         transaction_type='transfer',
-        description=transfer_data.description or f"Transfer to account {transfer_data.to_account_id}",
-        to_user_id=to_account.user_id,
-        to_account_id=transfer_data.to_account_id
+        description=transfer_data.description or f"Transfer to account {to_id}",
+        to_user_id=owners[to_id],
+        to_account_id=to_id
     )
-    
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
-    
-    return TransactionRead.from_orm(new_transaction)
 
 
 def create_purchase(
     purchase_data: TransactionPurchase,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Create a purchase transaction
@@ -317,61 +494,107 @@ def create_purchase(
     Raises:
         HTTPException: If validation fails or insufficient funds
     """
-    # Verify account
-    account = verify_account_exists_and_active(purchase_data.account_id, db)
-    
-    # Verify user owns the account
-    if account.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own this account")
-    
-    # Verify product
-    product = verify_product_exists_and_active(purchase_data.product_id, db)
-    
-    # Calculate total amount
-    total_amount = product.price * purchase_data.quantity
-    
-    # Verify currency matches
-    if account.currency != product.currency:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Currency mismatch. Account uses {account.currency}, product uses {product.currency}"
+    product_id = purchase_data.product_id
+    account_id = purchase_data.account_id
+    quantity = purchase_data.quantity
+    
+    # The purchasable product, priced for the requested quantity
+    product = select(
+        Product.id,
+        Product.title,
+        Product.currency,
+        (Product.price * quantity).label("amount")
+    ).where(
+        Product.id == product_id,
+        Product.is_active == 'active',
+        Product.deleted_at.is_(None)
+    ).cte("product")
+    
+    # Charge the account; the UPDATE only matches an active account owned by
+    # the user, in the product currency, that covers the total
+    charged = update(Account).where(
+        Account.id == account_id,
+        Account.user_id == user_id,
+        Account.status == 'active',
+        Account.deleted_at.is_(None),
+        Account.currency == product.c.currency,
+        Account.balance >= product.c.amount
+    ).values(
+        balance=Account.balance - product.c.amount
+    ).returning(
+        product.c.id.label("product_id"),
+        product.c.title,
+        product.c.currency,
+        product.c.amount
+    ).cte("charged")
+    
+    # Count the purchase on the product (featured products ranking)
+    counted = update(Product).where(
+        Product.id == charged.c.product_id
+    ).values(
+        purchase_count=Product.purchase_count + 1
+    ).cte("counted")
+    
+    if purchase_data.description:
+        description = literal(purchase_data.description)
+    else:
+        description = literal("Purchase of ") + charged.c.title + literal(f" (x{quantity})")
+    
+    # Validate, charge, count and record the purchase in one round trip
+    stmt = insert(Transaction).from_select(
+        [
+            Transaction.user_id,
+            Transaction.account_id,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.transaction_type,
+            Transaction.description,
+            Transaction.product_id
+        ],
+        select(
+            literal(user_id),
+            literal(account_id),
+            charged.c.amount,
+            charged.c.currency,
+            literal('purchase'),
+            description,
+            charged.c.product_id
         )
+    ).returning(*_TRANSACTION_READ_COLUMNS).add_cte(counted)
     
-    # Override amount with calculated total
-    actual_amount = total_amount
-    
-    # Check sufficient funds
-    if account.balance < actual_amount:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Insufficient funds. Required: {actual_amount} {account.currency}, Current balance: {account.balance} {account.currency}"
-        )
-    
-    # Update account balance
-    account.balance -= actual_amount
-    account.updated_at = datetime.now()
-    
-    # Create transaction
-    new_transaction = Transaction(
-        user_id=user_id,
-        account_id=purchase_data.account_id,
-        amount=actual_amount,
-        currency=account.currency,
-        transaction_type='purchase',
-        description=purchase_data.description or f"Purchase of {product.title} (x{purchase_data.quantity})",
-        product_id=purchase_data.product_id
-    )
-    
-    db.add(new_transaction)
-    db.commit()
-    db.refresh(new_transaction)
+    for _ in range(BALANCE_UPDATE_ATTEMPTS):
+        row = db.execute(stmt).first()
+        if row is not None:
+            db.commit()
+            return TransactionRead.model_validate(row._asdict())
+        
+        # Nothing was written; work out which check failed, if none did, try again
+        db.rollback()
+        product = verify_product_exists_and_active(product_id, db)
+        total_amount = product.price * quantity
+        account = verify_account_exists_and_active(account_id, db)
+        
+        if account.user_id != user_id:
+            raise HTTPException(status_code=403, detail="You don't own this account")
+        
+        if account.currency != product.currency:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Currency mismatch. Account uses {account.currency}, product uses {product.currency}"
+            )
+        
+        if account.balance < total_amount:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient funds. Required: {total_amount} {account.currency}, Current balance: {account.balance} {account.currency}"
+            )
     
-    return TransactionRead.from_orm(new_transaction)
+    raise_account_conflict(account_id)
 
 
 def get_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Get transaction by ID
@@ -387,129 +610,356 @@ def get_transaction(
         HTTPException: If transaction not found
     """
     transaction = get_transaction_by_id(transaction_id, db)
-    return TransactionRead.from_orm(transaction)
+    return TransactionRead.model_validate(transaction)
 
 
-def get_user_transactions(
+def apply_transaction_cursor(
+    stmt,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None
+):
+    """
+    Apply keyset pagination on (created_at, id), newest first
+    
+    Args:
+        stmt: Transaction lambda statement to paginate
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
+        
+    Returns:
+        Statement filtered past the cursor and ordered newest first
+        
+    Raises:
+        HTTPException: If only one part of the cursor is given
+    """
+    # created_at alone would skip transactions sharing the boundary timestamp
+    if (cursor_created_at is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=422,
+            detail="cursor_created_at and cursor_id must be given together"
+        )
+    
+    if cursor_id is not None:
+        stmt += lambda s: s.where(
+            tuple_(Transaction.created_at, Transaction.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    
+    stmt += lambda s: s.order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    return stmt
+
+
+def build_transaction_page(rows: List[dict], limit: int) -> dict:
+    """
+    Wrap a page of transaction rows with the cursor for the next page
+    
+    Args:
+        rows: Transaction dicts on the current page
+        limit: Page size that was requested
+        
+    Returns:
+        Dict shaped like TransactionPage; next_cursor is None on the last page
+    """
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = {"created_at": last["created_at"], "id": last["id"]}
+    
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def transaction_reads_from_rows(rows: List[dict]) -> List[TransactionRead]:
+    """
+    Wrap transaction row dicts in TransactionRead models
+    
+    Args:
+        rows: Transaction dicts with the TransactionRead fields
+        
+    Returns:
+        List of transaction models
+    """
+    # Rows come straight from our own table, no need to validate them again
+    return [TransactionRead.model_construct(**row) for row in rows]
+
+
+def build_user_transactions_query(
     user_id: int,
-    db: Session = Depends(get_db),
     filters: Optional[TransactionHistoryFilter] = None,
     include_deleted: bool = False,
-    skip: int = 0,
-    limit: int = 100
-) -> List[TransactionRead]:
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None
+):
     """
-    Get all transactions for a specific user with filters
+    Build the filtered, newest-first statement behind a user's transaction history
     
     Args:
         user_id: User ID
-        db: Database session
         filters: Optional filters for transactions
         include_deleted: Whether to include deleted transactions
-        skip: Number of records to skip
-        limit: Maximum number of records to return
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
         
     Returns:
-        List of user's transactions
+        Ordered statement over the user's transactions (TransactionRead columns)
     """
-    # Build base query - include transactions where user is sender or receiver
-    query = db.query(Transaction).filter(
+    # Base statement - include transactions where user is sender or receiver
+    stmt = lambda_stmt(lambda: select(*_TRANSACTION_READ_COLUMNS).where(
         or_(
             Transaction.user_id == user_id,
             Transaction.to_user_id == user_id
         )
-    )
+    ))
     
     if not include_deleted:
-        query = query.filter(Transaction.deleted_at.is_(None))
+        stmt += lambda s: s.where(Transaction.deleted_at.is_(None))
     
     # Apply filters if provided
     if filters:
-        if filters.account_id:
-            query = query.filter(
+        account_id = filters.account_id
+        if account_id:
+            stmt += lambda s: s.where(
                 or_(
-                    Transaction.account_id == filters.account_id,
-                    Transaction.to_account_id == filters.account_id
+                    Transaction.account_id == account_id,
+                    Transaction.to_account_id == account_id
                 )
             )
         
-        if filters.transaction_type:
-            query = query.filter(Transaction.transaction_type == filters.transaction_type)
+        transaction_type = filters.transaction_type
+        if transaction_type:
+            stmt += lambda s: s.where(Transaction.transaction_type == transaction_type)
         
-        if filters.min_amount:
-            query = query.filter(Transaction.amount >= filters.min_amount)
+        min_amount = filters.min_amount
+        if min_amount:
+            stmt += lambda s: s.where(Transaction.amount >= min_amount)
         
-        if filters.max_amount:
-            query = query.filter(Transaction.amount <= filters.max_amount)
+        max_amount = filters.max_amount
+        if max_amount:
+            stmt += lambda s: s.where(Transaction.amount <= max_amount)
         
-        if filters.date_from:
-            query = query.filter(Transaction.created_at >= filters.date_from)
+        date_from = filters.date_from
+        if date_from:
+            stmt += lambda s: s.where(Transaction.created_at >= date_from)
         
-        if filters.date_to:
-            query = query.filter(Transaction.created_at <= filters.date_to)
+        date_to = filters.date_to
+        if date_to:
+            stmt += lambda s: s.where(Transaction.created_at <= date_to)
     
     # Order by most recent first
-    transactions = query.order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return [TransactionRead.from_orm(transaction) for transaction in transactions]
+    return apply_transaction_cursor(stmt, cursor_created_at, cursor_id)
 
 
-def get_account_transactions(
-    account_id: int,
+def get_user_transactions(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
+    filters: Optional[TransactionHistoryFilter] = None,
     include_deleted: bool = False,
-    skip: int = 0,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
     limit: int = 100
 ) -> List[TransactionRead]:
     """
-    Get all transactions for a specific account
+    Get all transactions for a specific user with filters
+    
+    Args:
+        user_id: User ID
+        db: Database session
+        filters: Optional filters for transactions
+        include_deleted: Whether to include deleted transactions
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
+        limit: Maximum number of records to return
+        
+    Returns:
+        List of user's transactions
+    """
+    rows = get_user_transaction_rows(
+        user_id, db, filters, include_deleted, cursor_created_at, cursor_id, limit
+    )
+    
+    return transaction_reads_from_rows(rows)
+
+
+def get_user_transaction_rows(
+    user_id: int,
+    db: Session,
+    filters: Optional[TransactionHistoryFilter] = None,
+    include_deleted: bool = False,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
+    limit: int = 100
+) -> List[dict]:
+    """
+    Same as get_user_transactions, but returns plain row dicts for serialization
+    
+    Args:
+        user_id: User ID
+        db: Database session
+        filters: Optional filters for transactions
+        include_deleted: Whether to include deleted transactions
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
+        limit: Maximum number of records to return
+        
+    Returns:
+        List of transaction dicts with the TransactionRead fields
+    """
+    stmt = build_user_transactions_query(
+        user_id, filters, include_deleted, cursor_created_at, cursor_id
+    )
+    stmt += lambda s: s.limit(limit)
+    rows = db.execute(stmt).all()
+    
+    return [row._asdict() for row in rows]
+
+
+def build_account_transactions_query(
+    account_id: int,
+    user_id: int,
+    db: Session,
+    include_deleted: bool = False,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None
+):
+    """
+    Build the newest-first statement behind an account's transaction history
     
     Args:
         account_id: Account ID
         user_id: User ID (for permission check)
         db: Database session
         include_deleted: Whether to include deleted transactions
-        skip: Number of records to skip
-        limit: Maximum number of records to return
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
         
     Returns:
-        List of account's transactions
+        Ordered statement over the account's transactions (TransactionRead columns)
         
     Raises:
         HTTPException: If account not found or user doesn't own it
     """
-    # Verify account and ownership
-    account = db.query(Account).filter(Account.id == account_id).first()
+    # Verify account and ownership; only the owner column is needed
+    owner_id = db.query(Account.user_id).filter(Account.id == account_id).scalar()
     
-    if not account:
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Account not found")
     
-    if account.user_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(status_code=403, detail="You don't own this account")
     
-    # Build query - include transactions where account is source or destination
-    query = db.query(Transaction).filter(
+    # Build statement - include transactions where account is source or destination
+    stmt = lambda_stmt(lambda: select(*_TRANSACTION_READ_COLUMNS).where(
         or_(
             Transaction.account_id == account_id,
             Transaction.to_account_id == account_id
         )
-    )
+    ))
     
     if not include_deleted:
-        query = query.filter(Transaction.deleted_at.is_(None))
+        stmt += lambda s: s.where(Transaction.deleted_at.is_(None))
     
     # Order by most recent first
-    transactions = query.order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
+    return apply_transaction_cursor(stmt, cursor_created_at, cursor_id)
+
+
+def get_account_transactions(
+    account_id: int,
+    user_id: int,
+    db: Session,
+    include_deleted: bool = False,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
+    limit: int = 100
+) -> List[TransactionRead]:
+    """
+    Get all transactions for a specific account
     
-    return [TransactionRead.from_orm(transaction) for transaction in transactions]
+    Args:
+        account_id: Account ID
+        user_id: User ID (for permission check)
+        db: Database session
+        include_deleted: Whether to include deleted transactions
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
+        limit: Maximum number of records to return
+        
+    Returns:
+        List of account's transactions
+        
+    Raises:
+        HTTPException: If account not found or user doesn't own it
+    """
+    rows = get_account_transaction_rows(
+        account_id, user_id, db, include_deleted, cursor_created_at, cursor_id, limit
+    )
+    
+    return transaction_reads_from_rows(rows)
+
+
+def get_account_transaction_rows(
+    account_id: int,
+    user_id: int,
+    db: Session,
+    include_deleted: bool = False,
+    cursor_created_at: Optional[datetime] = None,
+    cursor_id: Optional[int] = None,
+    limit: int = 100
+) -> List[dict]:
+    """
+    Same as get_account_transactions, but returns plain row dicts for serialization
+    
+    Args:
+        account_id: Account ID
+        user_id: User ID (for permission check)
+        db: Database session
+        include_deleted: Whether to include deleted transactions
+        cursor_created_at: created_at of the last transaction on the previous page
+        cursor_id: ID of the last transaction on the previous page
+        limit: Maximum number of records to return
+        
+    Returns:
+        List of transaction dicts with the TransactionRead fields
+        
+    Raises:
+        HTTPException: If account not found or user doesn't own it
+    """
+    stmt = build_account_transactions_query(
+        account_id, user_id, db, include_deleted, cursor_created_at, cursor_id
+    )
+    stmt += lambda s: s.limit(limit)
+    rows = db.execute(stmt).all()
+    
+    return [row._asdict() for row in rows]
+
+
+def raise_transaction_write_error(transaction_id: int, user_id: int, db: Session) -> None:
+    """
+    Explain why an owner-guarded UPDATE on a transaction matched no row
+    
+    Args:
+        transaction_id: Transaction ID
+        user_id: User ID the write was guarded by
+        db: Database session
+        
+    Raises:
+        HTTPException: 404 if the transaction is missing or deleted, 403 if the
+            user doesn't own it
+    """
+    transaction = get_transaction_by_id(transaction_id, db)
+    
+    if transaction.user_id != user_id:
+        raise HTTPException(status_code=403, detail="You don't own this transaction")
+    
+    # The row changed between the UPDATE and this read
+    raise HTTPException(
+        status_code=409,
+        detail=f"Transaction {transaction_id} was modified concurrently, please retry"
+    )
 
 
 def update_transaction(
     transaction_id: int,
     user_id: int,
     transaction_data: TransactionUpdate,
-    db: Session = Depends(get_db)
+    db: Session
 ) -> TransactionRead:
     """
     Update transaction (only description can be updated)
@@ -526,28 +976,36 @@ def update_transaction(
     Raises:
         HTTPException: If transaction not found or user doesn't own it
     """
-    transaction = get_transaction_by_id(transaction_id, db)
-    
-    # Verify user owns the transaction
-    if transaction.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own this transaction")
-    
     # Update only description
+    values = {}
     if transaction_data.description is not None:
-        transaction.description = transaction_data.description
+        values["description"] = transaction_data.description
     
-    transaction.updated_at = datetime.now()
+    # Ownership is checked in the WHERE clause, in the same statement as the write
+    row = db.execute(
+        update(Transaction)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.user_id == user_id,
+            Transaction.deleted_at.is_(None)
+        )
+        .values(**values)
+        .returning(*_TRANSACTION_READ_COLUMNS)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if row is None:
+        raise_transaction_write_error(transaction_id, user_id, db)
     
     db.commit()
-    db.refresh(transaction)
     
-    return TransactionRead.from_orm(transaction)
+    return TransactionRead.model_validate(row._asdict())
 
 
 def delete_transaction(
     transaction_id: int,
     user_id: int,
-    db: Session = Depends(get_db),
+    db: Session,
     soft_delete: bool = True
 ) -> dict:
     """
@@ -565,14 +1023,30 @@ def delete_transaction(
     Raises:
         HTTPException: If transaction not found or user doesn't own it
     """
-    transaction = get_transaction_by_id(transaction_id, db)
-    
-    # Verify user owns the transaction
-    if transaction.user_id != user_id:
-        raise HTTPException(status_code=403, detail="You don't own this transaction")
+    # Always soft delete for audit purposes; ownership is checked in the WHERE
+    # clause, in the same statement as the write
+    transaction = db.execute(
+        update(Transaction)
+        .where(
+            Transaction.id == transaction_id,
+            Transaction.user_id == user_id,
+            Transaction.deleted_at.is_(None)
+        )
+        .values(deleted_at=func.now())
+        .returning(Transaction.transaction_type, Transaction.product_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+    
+    if transaction is None:
+        raise_transaction_write_error(transaction_id, user_id, db)
+    
+    # Deleted purchases no longer count towards the product's popularity
+    if transaction.transaction_type == 'purchase' and transaction.product_id:
+        db.query(Product).filter(Product.id == transaction.product_id).update(
+            {Product.purchase_count: Product.purchase_count - 1},
+            synchronize_session=False
+        )
     
-    # Always soft delete for audit purposes
-    transaction.deleted_at = datetime.now()
     db.commit()
     
     return {"message": "Transaction marked as deleted (soft delete for audit purposes)"}
@@ -581,7 +1055,7 @@ def delete_transaction(
 def get_user_transaction_stats(
     user_id: int,
     currency: str,
-    db: Session = Depends(get_db),
+    db: Session,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None
 ) -> TransactionStats:
@@ -598,13 +1072,40 @@ def get_user_transaction_stats(
     Returns:
         Transaction statistics
     """
-    # Build base query
-    query = db.query(Transaction).filter(
-        and_(
-            Transaction.user_id == user_id,
-            Transaction.currency == currency,
-            Transaction.deleted_at.is_(None)
-        )
+    sent = Transaction.user_id == user_id
+    received = and_(
+        Transaction.to_user_id == user_id,
+        Transaction.transaction_type == 'transfer'
+    )
+    
+    deposit = Transaction.transaction_type == 'deposit'
+    withdrawal = Transaction.transaction_type == 'withdrawal'
+    transfer = Transaction.transaction_type == 'transfer'
+    purchase = Transaction.transaction_type == 'purchase'
+    
+    def total(*criteria):
+        return func.coalesce(func.sum(Transaction.amount).filter(*criteria), 0)
+    
+    def count(*criteria):
+        return func.count(Transaction.id).filter(*criteria)
+    
+    # One pass over the user's sent and received transactions
+    query = db.query(
+        count(sent),
+        total(sent, deposit),
+        total(sent, withdrawal),
+        total(sent, transfer),
+        total(received),
+        total(sent, purchase),
+        count(sent, deposit),
+        count(sent, withdrawal),
+        count(sent, transfer),
+        count(received),
+        count(sent, purchase)
+    ).filter(
+        or_(sent, received),
+        Transaction.currency == currency,
+        Transaction.deleted_at.is_(None)
     )
     
     # Apply date filters
@@ -614,40 +1115,31 @@ def get_user_transaction_stats(
     if date_to:
         query = query.filter(Transaction.created_at <= date_to)
     
-    transactions = query.all()
-    
-    # Calculate stats
-    total_transactions = len(transactions)
-    total_deposits = sum(t.amount for t in transactions if t.transaction_type == 'deposit')
-    total_withdrawals = sum(t.amount for t in transactions if t.transaction_type == 'withdrawal')
-    total_transfers_sent = sum(t.amount for t in transactions if t.transaction_type == 'transfer')
-    total_purchases = sum(t.amount for t in transactions if t.transaction_type == 'purchase')
-    
-    # Calculate received transfers
-    received_query = db.query(Transaction).filter(
-        and_(
-            Transaction.to_user_id == user_id,
-            Transaction.transaction_type == 'transfer',
-            Transaction.currency == currency,
-            Transaction.deleted_at.is_(None)
-        )
-    )
-    
-    if date_from:
-        received_query = received_query.filter(Transaction.created_at >= date_from)
-    
-    if date_to:
-        received_query = received_query.filter(Transaction.created_at <= date_to)
-    
-    total_transfers_received = sum(t.amount for t in received_query.all())
+    (
+        total_transactions,
+        total_deposits,
+        total_withdrawals,
+        total_transfers_sent,
+        total_transfers_received,
+        total_purchases,
+        deposits_count,
+        withdrawals_count,
+        transfers_sent_count,
+        transfers_received_count,
+        purchases_count
+    ) = query.one()
     
     return TransactionStats(
         total_transactions=total_transactions,
-        total_deposits=Decimal(str(total_deposits)),
-        total_withdrawals=Decimal(str(total_withdrawals)),
-        total_transfers_sent=Decimal(str(total_transfers_sent)),
-        total_transfers_received=Decimal(str(total_transfers_received)),
-        total_purchases=Decimal(str(total_purchases)),
+        total_deposits=total_deposits,
+        total_withdrawals=total_withdrawals,
+        total_transfers_sent=total_transfers_sent,
+        total_transfers_received=total_transfers_received,
+        total_purchases=total_purchases,
+        deposits_count=deposits_count,
+        withdrawals_count=withdrawals_count,
+        transfers_sent_count=transfers_sent_count,
+        transfers_received_count=transfers_received_count,
+        purchases_count=purchases_count,
         currency=currency
     )
-
@@ -33,6 +33,11 @@ export interface Transaction {
   deleted_at?: string | null;
 }
 
+export interface TransactionPage {
+  items: Transaction[];
+  next_cursor: { created_at: string; id: number } | null;
+}
+
 export interface TransactionDepositRequest {
   account_id: number;
   amount: number;
@@ -229,15 +234,23 @@ export async function getUserTransactions(
   filters?: {
     account_id?: number;
     transaction_type?: string;
-    skip?: number;
+    cursor_created_at?: string;
+    cursor_id?: number;
     limit?: number;
   }
 ): Promise<Transaction[]> {
   const params = new URLSearchParams({
-    skip: String(filters?.skip ?? 0),
     limit: String(filters?.limit ?? 100),
   });
 
+  if (filters?.cursor_created_at) {
+    params.append('cursor_created_at', filters.cursor_created_at);
+  }
+
+  if (filters?.cursor_id) {
+    params.append('cursor_id', String(filters.cursor_id));
+  }
+
   if (filters?.account_id) {
     params.append('account_id', String(filters.account_id));
   }
@@ -261,7 +274,8 @@ export async function getUserTransactions(
     throw new Error(errorMsg);
   }
 
-  return response.json();
+  const page: TransactionPage = await response.json();
+  return page.items;
 }
 
 /**
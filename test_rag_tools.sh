@@ -41,6 +41,28 @@ test_rag_query() {
     echo ""
 }
 
+# Read-only queries that don't depend on each other run concurrently; each job
+# writes to a numbered file and the files are printed in order by wait_rag_queries
+RESULTS_DIR=$(mktemp -d)
+trap 'rm -rf "$RESULTS_DIR"' EXIT
+RESULT_SEQ=0
+
+# Function to start a read-only RAG query in the background
+test_rag_query_concurrent() {
+    RESULT_SEQ=$((RESULT_SEQ + 1))
+    test_rag_query "$@" > "${RESULTS_DIR}/$(printf '%04d' "$RESULT_SEQ")" 2>&1 &
+}
+
+# Function to wait for background queries and print their results in order
+wait_rag_queries() {
+    wait
+    for result in "$RESULTS_DIR"/*; do
+        [ -e "$result" ] || continue
+        cat "$result"
+        rm -f "$result"
+    done
+}
+
 # Step 1: Create Test User
 echo -e "${BLUE}STEP 1: Creating Test User${NC}"
 echo "────────────────────────────────────────────────────────────────────"
@@ -81,9 +103,10 @@ echo -e "${BLUE}CATEGORY 1: ACCOUNT INFORMATION TOOLS (3 tools)${NC}"
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
 echo ""
 
-test_rag_query "Account" "How much money do I have?" "$USER_ID"
-test_rag_query "Account" "Show me all my accounts" "$USER_ID"
-test_rag_query "Account" "What are the details of my account 1?" "$USER_ID"
+test_rag_query_concurrent "Account" "How much money do I have?" "$USER_ID"
+test_rag_query_concurrent "Account" "Show me all my accounts" "$USER_ID"
+test_rag_query_concurrent "Account" "What are the details of my account 1?" "$USER_ID"
+wait_rag_queries
 
 # Step 5: Test Transaction Action Tools
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
@@ -101,9 +124,10 @@ echo -e "${BLUE}CATEGORY 3: TRANSACTION HISTORY TOOLS (4 tools)${NC}"
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
 echo ""
 
-test_rag_query "Transaction History" "Show me my recent transactions" "$USER_ID"
-test_rag_query "Transaction History" "What are my transaction statistics?" "$USER_ID"
-test_rag_query "Transaction History" "Show transactions for account 1" "$USER_ID"
+test_rag_query_concurrent "Transaction History" "Show me my recent transactions" "$USER_ID"
+test_rag_query_concurrent "Transaction History" "What are my transaction statistics?" "$USER_ID"
+test_rag_query_concurrent "Transaction History" "Show transactions for account 1" "$USER_ID"
+wait_rag_queries
 
 # Step 7: Test Product Tools
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
@@ -111,9 +135,10 @@ echo -e "${BLUE}CATEGORY 4: PRODUCT TOOLS (4 tools)${NC}"
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
 echo ""
 
-test_rag_query "Products" "Search for Islamic banking products" "$USER_ID"
-test_rag_query "Products" "Show me products in savings category" "$USER_ID"
-test_rag_query "Products" "What are the featured products?" "$USER_ID"
+test_rag_query_concurrent "Products" "Search for Islamic banking products" "$USER_ID"
+test_rag_query_concurrent "Products" "Show me products in savings category" "$USER_ID"
+test_rag_query_concurrent "Products" "What are the featured products?" "$USER_ID"
+wait_rag_queries
 
 # Step 8: Test Cart Tools
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
@@ -131,8 +156,9 @@ echo -e "${BLUE}CATEGORY 6: KNOWLEDGE SEARCH TOOLS (2 tools)${NC}"
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"
 echo ""
 
-test_rag_query "Knowledge" "What is Zaman Bank's mission?" "$USER_ID"
-test_rag_query "Web Search" "What are the latest AI trends in 2025?" "$USER_ID"
+test_rag_query_concurrent "Knowledge" "What is Zaman Bank's mission?" "$USER_ID"
+test_rag_query_concurrent "Web Search" "What are the latest AI trends in 2025?" "$USER_ID"
+wait_rag_queries
 
 # Step 10: Combined Queries
 echo -e "${BLUE}═══════════════════════════════════════════════════════════════════${NC}"